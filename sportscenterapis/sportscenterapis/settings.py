@@ -16,6 +16,7 @@ import cloudinary.uploader
 import cloudinary.api
 from dotenv import load_dotenv
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -39,7 +40,7 @@ DEBUG = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
+        'sportscenters.authentication.CachedOAuth2Authentication',
     ),
 }
 
@@ -167,10 +168,15 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache dùng chung giữa các worker (gunicorn) trên cùng máy
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'sportscenter_cache')),
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
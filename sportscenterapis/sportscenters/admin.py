@@ -181,6 +181,10 @@ class ClassAdmin(admin.ModelAdmin):
     search_fields = ('name', 'trainer__full_name')
     ordering = ['-start_time']
 
+    def get_queryset(self, request):
+        # Admin vẫn thấy các lớp đã bị xóa mềm
+        return Class.objects.with_deleted()
+
 
 class EnrollmentAdmin(admin.ModelAdmin):
     list_display = ('member', 'gym_class', 'status', 'created_date')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SportscentersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sportscenters'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,106 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .models import Class, Enrollment, InternalNews
+from .paginators import StandardResultsSetPagination
+from .push import authenticate
+from .serializers import ClassSerializer, InternalNewsSerializer, UserSerializer
+
+'''
+Bản async của các endpoint đọc nhiều (mount dưới /async/), dùng async ORM nên dưới ASGI
+không giữ thread trong lúc chờ MySQL. Mọi dữ liệu serializer cần đều được lấy sẵn
+(select_related, enrolled_class_ids trong context) trước khi serialize, nên serializer
+chạy trên event loop mà không chạm DB; nếu lỡ truy vấn, Django sẽ báo SynchronousOnlyOperation.
+Định dạng trả về giống hệt bản đồng bộ.
+'''
+
+PAGE_SIZE = StandardResultsSetPagination.page_size
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def login_required(view):
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+        user = await sync_to_async(authenticate)(request)
+        if user is None:
+            return json_response({"detail": "Thông tin xác thực không hợp lệ."}, status=401)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def paginate(request, queryset):
+    """
+    Giống StandardResultsSetPagination: {'count', 'next', 'previous', 'results'}.
+    """
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    count = await queryset.acount()
+    offset = (page - 1) * PAGE_SIZE
+    if page < 1 or (page > 1 and offset >= count):
+        return None
+
+    objects = [obj async for obj in queryset[offset:offset + PAGE_SIZE].aiterator()]
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if offset + PAGE_SIZE < count else None
+    if page == 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+    return {'count': count, 'next': next_url, 'previous': previous_url, 'results': objects}
+
+
+async def class_context(request):
+    enrolled = set()
+    if request.user.role == 'member':
+        enrolled = {pk async for pk in Enrollment.objects.filter(
+            member_id=request.user.pk, status='approved'
+        ).values_list('gym_class_id', flat=True).aiterator()}
+    return {'request': request, 'enrolled_class_ids': enrolled}
+
+
+@login_required
+async def class_list(request):
+    queryset = Class.objects.select_related('trainer').order_by('id')
+    trainer_id = request.GET.get('trainer')
+    if trainer_id:
+        queryset = queryset.filter(trainer_id=trainer_id)
+
+    page = await paginate(request, queryset)
+    if page is None:
+        return json_response({"detail": "Invalid page."}, status=404)
+    page['results'] = ClassSerializer(page['results'], many=True, context=await class_context(request)).data
+    return json_response(page)
+
+
+@login_required
+async def trainer_class_list(request):
+    if request.user.role != 'trainer':
+        return json_response([])
+    classes = [obj async for obj in Class.objects.filter(
+        trainer_id=request.user.pk).select_related('trainer').order_by('id').aiterator()]
+    return json_response(ClassSerializer(classes, many=True, context=await class_context(request)).data)
+
+
+@login_required
+async def internal_news_list(request):
+    page = await paginate(request, InternalNews.objects.select_related('author').order_by('id'))
+    if page is None:
+        return json_response({"detail": "Invalid page."}, status=404)
+    page['results'] = InternalNewsSerializer(page['results'], many=True, context={'request': request}).data
+    return json_response(page)
+
+
+@login_required
+async def current_user(request):
+    return json_response(UserSerializer(request.user).data)
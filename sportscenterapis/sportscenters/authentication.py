@@ -0,0 +1,125 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from . import caching
+
+'''
+Xác thực OAuth2 có cache: token đã kiểm tra hợp lệ được giữ ngắn hạn trong LRU của
+tiến trình và trong cache dùng chung, khóa là sha256 của token (không lưu token gốc).
+Mỗi mục cache gắn với version riêng của người dùng sở hữu token: sửa người dùng hoặc
+thu hồi/sửa một token chỉ làm mới version của người đó (signals), các người dùng khác
+không bị ảnh hưởng. Thu hồi token còn xóa luôn mục của chính token đó.
+'''
+
+AUTH_CACHE_TIMEOUT = 60  # giây
+LOCAL_CACHE_SIZE = 1024
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+local_cache = LRUCache(LOCAL_CACHE_SIZE)
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def entry_key(digest):
+    return f'auth:{digest}'
+
+
+def user_namespace(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    caching.bump_version(user_namespace(user_id))
+
+
+def invalidate_token(token, user_id):
+    """
+    Bỏ mục cache của một token sau khi commit. Version của chủ token cũng được làm mới
+    để LRU trong tiến trình của các worker khác không dùng lại mục đã xóa.
+    """
+    key = entry_key(token_digest(token))
+    transaction.on_commit(lambda: cache.delete(key))
+    invalidate_user(user_id)
+
+
+def bearer_token(request):
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(parts) == 2 and parts[0].lower() == 'bearer':
+        return parts[1]
+    return None
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    """
+    OAuth2Authentication với cache kết quả theo token; lần đầu (hoặc khi hết hạn cache)
+    vẫn kiểm tra qua django-oauth-toolkit như cũ.
+    """
+
+    def authenticate(self, request):
+        token = bearer_token(request)
+        if token is None:
+            # Token gửi qua body/query string: để oauthlib xử lý như cũ
+            return super().authenticate(request)
+
+        digest = token_digest(token)
+        now = time.time()
+
+        entry = local_cache.get(digest)
+        if entry is None or entry['expires'] <= now:
+            entry = cache.get(entry_key(digest))
+        if (entry is not None and entry['expires'] > now
+                and entry['version'] == caching.get_version(user_namespace(entry['user_id']))):
+            local_cache.set(digest, entry)
+            # Mỗi request nhận bản sao riêng của user/token
+            return pickle.loads(entry['data'])
+
+        result = super().authenticate(request)
+        if result is None:
+            local_cache.delete(digest)
+            return None
+
+        user, access_token = result
+        timeout = min(AUTH_CACHE_TIMEOUT, (access_token.expires - timezone.now()).total_seconds())
+        if timeout > 0:
+            entry = {
+                'user_id': user.pk,
+                'version': caching.get_version(user_namespace(user.pk)),
+                'expires': now + timeout,
+                'data': pickle.dumps((user, access_token))
+            }
+            local_cache.set(digest, entry)
+            cache.set(entry_key(digest), entry, timeout=int(timeout) or 1)
+        return result
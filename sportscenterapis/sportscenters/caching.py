@@ -0,0 +1,200 @@
+import fcntl
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+
+'''
+Mỗi namespace có một version dùng chung. Khi dữ liệu gốc thay đổi chỉ cần tăng
+version, mọi giá trị đã cache của namespace đó tự hết hiệu lực trên tất cả worker
+vì backend cache được dùng chung.
+
+get_or_compute chống "cache stampede":
+- Chỉ request giữ được khóa mới tính lại, các request khác nhận ngay giá trị cũ
+  (stale-while-revalidate). add() của FileBasedCache không nguyên tử (has_key rồi set)
+  nên với backend này khóa là flock trên file; backend khác dùng cache.add.
+- Làm mới sớm theo xác suất (XFetch): khi gần hết hạn, mỗi request có xác suất
+  tự làm mới tăng dần theo thời gian tính toán lần trước.
+'''
+
+LOCK_TIMEOUT = 30  # giây, tối đa thời gian một lần tính lại
+LOCK_SLOTS = 1024  # số file khóa cố định của FileBasedCache, khóa được băm vào một ô
+COUNTER_FLUSH_INTERVAL = 10  # giây, ghi dồn bộ đếm hit/miss vào cache dùng chung
+STALE_TIMEOUT = 24 * 3600  # giữ giá trị cũ thêm để phục vụ trong lúc tính lại
+
+
+def version_key(namespace):
+    return f'version:{namespace}'
+
+
+def new_version():
+    # Version là thời điểm tạo (ns) nên không bao giờ lặp lại, kể cả khi khóa version bị
+    # cache loại bỏ (cull) rồi tạo lại: các khóa/ETag cũ không thể hợp lệ trở lại
+    return time.time_ns()
+
+
+def get_version(namespace):
+    return cache.get_or_set(version_key(namespace), new_version, timeout=None)
+
+
+def bump_version(*namespaces):
+    """
+    Tăng version sau khi transaction hiện tại commit (chạy ngay nếu không trong transaction),
+    để request khác không cache dữ liệu chưa commit dưới version mới.
+    """
+    def bump():
+        for namespace in namespaces:
+            cache.set(version_key(namespace), new_version(), timeout=None)
+    transaction.on_commit(bump)
+
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+_counters_flushed = time.monotonic()
+
+
+def flush_counters():
+    global _counters_flushed
+    with _counters_lock:
+        pending = dict(_counters)
+        _counters.clear()
+        _counters_flushed = time.monotonic()
+    for counter, count in pending.items():
+        try:
+            cache.incr(counter, count)
+        except ValueError:
+            cache.set(counter, count, timeout=None)
+
+
+def record(namespace, outcome):
+    # Đếm trong tiến trình, chỉ ghi vào cache dùng chung mỗi COUNTER_FLUSH_INTERVAL giây
+    # (mỗi lần ghi FileBasedCache có thể phải liệt kê cả thư mục để cull)
+    with _counters_lock:
+        _counters[f'cache_{outcome}:{namespace}'] += 1
+        due = time.monotonic() - _counters_flushed >= COUNTER_FLUSH_INTERVAL
+    if due:
+        flush_counters()
+
+
+def acquire_lock(lock_key):
+    """
+    Khóa không chờ cho một lần tính lại. Trả về hàm nhả khóa, hoặc None nếu đang có người giữ.
+    """
+    backend = caches['default']
+    if isinstance(backend, FileBasedCache):
+        lock_dir = os.path.join(backend._dir, 'locks')
+        os.makedirs(lock_dir, exist_ok=True)
+        # Số ô cố định để thư mục khóa không lớn dần theo số khóa (cull/clear không dọn thư mục này);
+        # hai khóa trùng ô chỉ khiến một request chờ hoặc dùng giá trị cũ
+        slot = int(hashlib.md5(lock_key.encode()).hexdigest(), 16) % LOCK_SLOTS
+        path = os.path.join(lock_dir, str(slot))
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+
+        def release():
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        return release
+
+    if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        return lambda: cache.delete(lock_key)
+    return None
+
+
+def should_refresh(entry, beta):
+    # XFetch: now - delta * beta * ln(rand) >= expires
+    now = time.time()
+    return now - entry['delta'] * beta * math.log(1.0 - random.random()) >= entry['expires']
+
+
+def get_or_compute(namespace, key, compute, timeout=3600, beta=1.0):
+    """
+    Lấy giá trị từ cache, nếu đã cũ thì chỉ một request tính lại còn lại dùng giá trị cũ.
+    """
+    version = get_version(namespace)
+    entry_key = f'{namespace}:{key}'
+    lock_key = f'lock:{entry_key}'
+    entry = cache.get(entry_key)
+
+    if entry and entry['version'] == version and not should_refresh(entry, beta):
+        record(namespace, 'hits')
+        return entry['value']
+
+    release = acquire_lock(lock_key)
+    if release is None and entry:
+        record(namespace, 'stale')
+        return entry['value']
+
+    waited = release is None
+    if waited:
+        # Chưa có giá trị cũ: chờ request đang giữ khóa tính xong
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(entry_key)
+            if entry and entry['version'] == version:
+                record(namespace, 'hits')
+                return entry['value']
+            release = acquire_lock(lock_key)
+            if release is not None:
+                break
+        else:
+            record(namespace, 'misses')
+            return compute()
+
+    try:
+        if waited:
+            # Request giữ khóa trước có thể vừa tính xong
+            entry = cache.get(entry_key)
+            if entry and entry['version'] == version:
+                record(namespace, 'hits')
+                return entry['value']
+        record(namespace, 'misses')
+        started = time.monotonic()
+        value = compute()
+        cache.set(entry_key, {
+            'value': value,
+            'version': version,
+            'expires': time.time() + timeout,
+            'delta': time.monotonic() - started
+        }, timeout=timeout + STALE_TIMEOUT)
+        return value
+    finally:
+        release()
+
+
+def user_response(request, endpoint, compute, namespaces=('users', 'schedule'), timeout=300):
+    """
+    Cache response theo người dùng và endpoint (namespace 'responses'). Khóa chứa version
+    của các namespace dữ liệu nên ghi User/Class/Enrollment là response cũ tự hết hiệu lực.
+    """
+    versions = '.'.join(str(get_version(namespace)) for namespace in namespaces)
+    query = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+    key = f'{endpoint}:{request.user.pk}:{versions}:{query}'
+    return get_or_compute('responses', key, compute, timeout=timeout)
+
+
+def cache_stats(namespace):
+    flush_counters()
+    hits = cache.get(f'cache_hits:{namespace}', 0)
+    stale = cache.get(f'cache_stale:{namespace}', 0)
+    misses = cache.get(f'cache_misses:{namespace}', 0)
+    total = hits + stale + misses
+    return {
+        'namespace': namespace,
+        'version': get_version(namespace),
+        'hits': hits,
+        'stale': stale,
+        'misses': misses,
+        'hit_ratio': round((hits + stale) / total, 4) if total else 0.0
+    }
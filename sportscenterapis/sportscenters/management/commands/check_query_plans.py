@@ -0,0 +1,111 @@
+import re
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+from sportscenters import schedule, views
+from sportscenters.models import Class, Member, Payment, Appointment, Statistic, Trainer, Receptionist
+
+
+def view_queryset(view_class, user, **params):
+    """
+    Queryset mà view thực sự chạy cho GET list với các tham số query: get_queryset(),
+    filter backend và thứ tự của paginator (nếu có).
+    """
+    request = Request(RequestFactory().get('/', params))
+    request.user = user
+    view = view_class(request=request, action='list', format_kwarg=None, args=(), kwargs={})
+    queryset = view.filter_queryset(view.get_queryset())
+    ordering = getattr(view.pagination_class, 'ordering', None)
+    if isinstance(ordering, str):
+        queryset = queryset.order_by(ordering)
+    return queryset
+
+
+def hot_queries(member, trainer, receptionist, gym_class):
+    """
+    Truy vấn chính của các viewset/thống kê có điều kiện lọc, mỗi truy vấn phải dùng được index.
+    Truy vấn của viewset lấy từ chính view (view_queryset) nên luôn khớp với code đang chạy.
+    """
+    now = timezone.now()
+    today = now.date()
+    return {
+        'classes_by_trainer': view_queryset(views.ClassViewSet, receptionist, trainer=trainer.pk),
+        'trainer_classes': view_queryset(views.TrainerClassListView, trainer),
+        'trainer_students': view_queryset(views.TrainerStudentListView, trainer),
+        'member_enrollments': view_queryset(views.EnrollmentViewSet, member),
+        'class_enrollments': view_queryset(views.EnrollmentViewSet, receptionist, gym_class=gym_class.pk),
+        'member_notifications': view_queryset(views.NotificationViewSet, member),
+        'member_search': view_queryset(views.MemberViewSet, receptionist, search='ngu'),
+        'members_not_in_class': view_queryset(
+            views.MemberViewSet, receptionist, not_in_class=gym_class.pk, search='ngu'),
+        'payments_by_status_date': Payment.objects.filter(
+            status='success', date_paid__gte=now - timedelta(days=30)),
+        'members_joined': Member.objects.filter(
+            join_date__range=[today - timedelta(days=30), today]),
+        'members_cancelled': Member.objects.filter(
+            cancellation_date__range=[today - timedelta(days=30), today]),
+        'live_schedule': Class.objects.filter(start_time__gte=now).order_by('start_time'),
+        'trainer_appointments': Appointment.objects.filter(
+            trainer_id=trainer.pk, date_time__gte=now),
+        'schedule_classes': Class.objects.filter(
+            schedule.class_overlaps(now, now + timedelta(days=7)), trainer_id__in=[trainer.pk]),
+        'schedule_all_classes': Class.objects.filter(schedule.class_overlaps(now, now + timedelta(days=7))),
+        'schedule_member_appointments': Appointment.objects.filter(
+            schedule.appointment_overlaps(now, now + timedelta(days=7)), member_id__in=[member.pk]),
+        'schedule_all_appointments': Appointment.objects.filter(
+            schedule.appointment_overlaps(now, now + timedelta(days=7))),
+        'trainer_busy_classes': Class.objects.filter(
+            schedule.class_overlaps(now, now + timedelta(hours=1)), trainer_id=trainer.pk).exclude(status='cancelled'),
+        'trainer_busy_appointments': Appointment.objects.filter(
+            schedule.appointment_overlaps(now, now + timedelta(hours=1)), trainer_id=trainer.pk),
+        'statistic_rows': Statistic.objects.filter(
+            period_type='monthly', class_id__isnull=True, period_start__gte=today - timedelta(days=365)),
+    }
+
+
+def full_scans(plan):
+    """
+    Trả về các bảng bị quét toàn bộ trong kết quả EXPLAIN (SQLite hoặc MySQL).
+    """
+    if connection.vendor == 'sqlite':
+        # "SCAN bảng" không kèm "USING ... INDEX" là quét toàn bảng
+        return [m.group(1) for m in re.finditer(r'SCAN (\w+)(?! USING)', plan)]
+    if connection.vendor == 'mysql':
+        # Cột type = ALL trong EXPLAIN dạng bảng
+        scans = []
+        for line in plan.splitlines():
+            columns = line.split()
+            if 'ALL' in columns:
+                scans.append(columns[2] if len(columns) > 2 else line)
+        return scans
+    return []
+
+
+class Command(BaseCommand):
+    help = 'Chạy EXPLAIN các truy vấn chính và báo lỗi nếu có truy vấn quét toàn bảng'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='In toàn bộ kết quả EXPLAIN')
+
+    def handle(self, *args, **options):
+        member, trainer, receptionist = Member.objects.first(), Trainer.objects.first(), Receptionist.objects.first()
+        gym_class = Class.objects.first()
+        if not (member and trainer and receptionist and gym_class):
+            raise CommandError('Cần có ít nhất một hội viên, huấn luyện viên, lễ tân và lớp học để tạo truy vấn.')
+
+        failures = []
+        for name, queryset in hot_queries(member, trainer, receptionist, gym_class).items():
+            plan = queryset.explain()
+            scans = full_scans(plan)
+            status = f'FULL SCAN ({", ".join(scans)})' if scans else 'OK'
+            self.stdout.write(f'{name}: {status}')
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+            if scans:
+                failures.append(name)
+
+        if failures:
+            raise CommandError(f'Truy vấn quét toàn bảng: {", ".join(failures)}')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from sportscenters import search
+
+
+class Command(BaseCommand):
+    help = 'Dựng lại bảng từ khóa tìm kiếm hội viên'
+
+    def handle(self, *args, **options):
+        count = search.reindex_all()
+        self.stdout.write(f'Đã đánh index {count} hội viên')
@@ -0,0 +1,24 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from sportscenters import rollups
+from sportscenters.stats import PERIOD_TRUNC
+
+
+class Command(BaseCommand):
+    help = 'Materialize thống kê của các kỳ đã đóng vào bảng Statistic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', choices=list(PERIOD_TRUNC), action='append',
+                            help='Chỉ tính cho chu kỳ này (có thể lặp lại), mặc định tất cả')
+        parser.add_argument('--since', help='Ngày bắt đầu (YYYY-MM-DD), mặc định 365 ngày trước')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid date format')
+
+        for period, count in rollups.rollup(options['period'], since).items():
+            self.stdout.write(f'{period}: {count} kỳ')
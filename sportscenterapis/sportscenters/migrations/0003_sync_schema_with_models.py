@@ -0,0 +1,177 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+'''
+Đồng bộ migration với models: các cột/bảng dưới đây đã có sẵn trên DB đang chạy
+(0002 gốc đã bị sửa tay) nhưng chưa có trong migration. Phần state luôn được cập nhật,
+còn DB chỉ thêm/xóa những gì còn thiếu nên chạy được cả trên DB mới lẫn DB cũ.
+'''
+
+
+def table_columns(schema_editor, table):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        return {column.name for column in connection.introspection.get_table_description(cursor, table)}
+
+
+def drop_schedule_column(apps, schema_editor):
+    Class = apps.get_model('sportscenters', 'Class')
+    if 'schedule' in table_columns(schema_editor, Class._meta.db_table):
+        schema_editor.remove_field(Class, Class._meta.get_field('schedule'))
+
+
+def add_missing_columns(apps, schema_editor):
+    Statistic = apps.get_model('sportscenters', 'Statistic')
+    if Statistic._meta.db_table not in schema_editor.connection.introspection.table_names():
+        schema_editor.create_model(Statistic)
+
+    for model_name, field_names in (
+        ('Class', ['current_capacity', 'deleted_at', 'start_time', 'end_time']),
+        ('Member', ['join_date', 'cancellation_date']),
+    ):
+        model = apps.get_model('sportscenters', model_name)
+        for field_name in field_names:
+            field = model._meta.get_field(field_name)
+            # Đọc lại mỗi lần: SQLite dựng lại cả bảng theo model nên có thể đã thêm luôn các cột khác
+            if field.column not in table_columns(schema_editor, model._meta.db_table):
+                schema_editor.add_field(model, field)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportscenters', '0002_remove_class_schedule_class_current_capacity_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_schedule_column, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='class',
+                    name='schedule',
+                ),
+                migrations.AddField(
+                    model_name='class',
+                    name='current_capacity',
+                    field=models.PositiveIntegerField(default=0),
+                ),
+                migrations.AddField(
+                    model_name='class',
+                    name='deleted_at',
+                    field=models.DateTimeField(blank=True, default=None, null=True),
+                ),
+                migrations.AddField(
+                    model_name='class',
+                    name='end_time',
+                    field=models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                migrations.AddField(
+                    model_name='class',
+                    name='start_time',
+                    field=models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                migrations.AddField(
+                    model_name='member',
+                    name='cancellation_date',
+                    field=models.DateField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='member',
+                    name='join_date',
+                    field=models.DateField(blank=True, null=True),
+                ),
+                migrations.CreateModel(
+                    name='Statistic',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('period_type', models.CharField(choices=[('weekly', 'Weekly'), ('monthly', 'Monthly'), ('yearly', 'Yearly')], max_length=20)),
+                        ('period_start', models.DateField()),
+                        ('period_end', models.DateField()),
+                        ('member_count', models.IntegerField(default=0)),
+                        ('new_members', models.IntegerField(default=0)),
+                        ('cancelled_members', models.IntegerField(default=0)),
+                        ('total_revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                        ('enrollment_count', models.IntegerField(default=0)),
+                        ('attendance_rate', models.FloatField(default=0.0)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('class_id', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='sportscenters.class')),
+                    ],
+                ),
+            ],
+        ),
+        migrations.RunPython(add_missing_columns, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='created_date',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='class',
+            name='created_date',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='class',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='created_date',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='status',
+            field=models.CharField(default='approved', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='internalnews',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='progress',
+            name='created_date',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='progress',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trainer',
+            name='experience_years',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='trainer',
+            name='specialization',
+            field=models.CharField(choices=[('gym', 'Gym'), ('yoga', 'Yoga'), ('swimming', 'Swimming'), ('dance', 'Dance')], max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='created_date',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportscenters', '0003_sync_schema_with_models'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='statistic',
+            index=models.Index(fields=['period_type', 'class_id', 'period_start'], name='sportscente_period__17af14_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statistic',
+            index=models.Index(fields=['period_end'], name='sportscente_period__b78c4a_idx'),
+        ),
+    ]
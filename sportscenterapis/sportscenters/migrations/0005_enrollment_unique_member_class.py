@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:43
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_enrollments(apps, schema_editor):
+    # Giữ lại đăng ký đầu tiên của mỗi cặp (member, gym_class) trước khi thêm ràng buộc unique
+    Enrollment = apps.get_model('sportscenters', 'Enrollment')
+    duplicates = (Enrollment.objects.values('member_id', 'gym_class_id')
+                  .annotate(first_id=Min('id'), total=Count('id'))
+                  .filter(total__gt=1))
+    for row in duplicates:
+        Enrollment.objects.filter(
+            member_id=row['member_id'],
+            gym_class_id=row['gym_class_id']
+        ).exclude(id=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportscenters', '0004_statistic_rollup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_enrollments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('member', 'gym_class'), name='unique_enrollment_member_class'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from sportscenters.search import SEARCH_FIELDS, member_terms
+
+
+def index_existing_members(apps, schema_editor):
+    # Dựng bảng từ khóa cho các hội viên đã có, để ?search= dùng được ngay sau khi deploy
+    Member = apps.get_model('sportscenters', 'Member')
+    MemberSearchTerm = apps.get_model('sportscenters', 'MemberSearchTerm')
+    batch = []
+    for member in Member.objects.only('pk', *SEARCH_FIELDS).iterator(chunk_size=1000):
+        batch.extend(MemberSearchTerm(member_id=member.pk, term=term) for term in member_terms(member))
+        if len(batch) >= 5000:
+            MemberSearchTerm.objects.bulk_create(batch)
+            batch = []
+    MemberSearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportscenters', '0005_enrollment_unique_member_class'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='sportscenters.member')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'member'], name='sportscente_term_9d6af4_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_members, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportscenters', '0006_membersearchterm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['gym_class', 'status', 'member'], name='sportscente_gym_cla_f4a171_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportscenters', '0007_enrollment_class_status_member_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['trainer', 'date_time'], name='sportscente_trainer_ebeb84_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='class',
+            index=models.Index(fields=['trainer', 'deleted_at', 'start_time'], name='sportscente_trainer_876286_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['join_date'], name='sportscente_join_da_35d3ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['cancellation_date'], name='sportscente_cancell_a33d91_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['member', 'is_read', 'created_at'], name='sportscente_member__3df2c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'date_paid'], name='sportscente_status_d3497e_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportscenters', '0008_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='class',
+            index=models.Index(fields=['deleted_at', 'start_time'], name='sportscente_deleted_033a1f_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sportscenters', '0009_class_deleted_at_start_time_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['member', 'date_time'], name='sportscente_member__321c31_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date_time'], name='sportscente_date_ti_399a52_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+from . import caching
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified cho list và retrieve dựa trên updated_date.
+    List: fingerprint = Max(updated_date) + số dòng của queryset đã lọc (một truy vấn).
+    Retrieve: updated_date của đối tượng.
+    Khớp If-None-Match / If-Modified-Since thì trả 304 mà không serialize.
+
+    etag_namespaces: các namespace version (caching.bump_version) của dữ liệu lồng trong
+    response nhưng không làm đổi updated_date của chính đối tượng. Khi có namespace thì
+    không gửi Last-Modified vì mốc thời gian không phản ánh được các thay đổi đó.
+    """
+    etag_namespaces = ()
+
+    def make_etag(self, *parts):
+        request = self.request
+        versions = [caching.get_version(namespace) for namespace in self.etag_namespaces]
+        raw = '|'.join(str(part) for part in (
+            type(self).__name__, request.user.pk, request.META.get('QUERY_STRING', ''), *versions, *parts
+        ))
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def conditional_response(self, response, etag, last_modified=None):
+        response['ETag'] = etag
+        if last_modified and not self.etag_namespaces:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Nội dung phụ thuộc người dùng (token) nên cache trung gian phải tách theo Authorization
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fingerprint = queryset.order_by().aggregate(last_modified=Max('updated_date'), count=Count('pk'))
+        etag = self.make_etag('list', fingerprint['last_modified'], fingerprint['count'])
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self.conditional_response(not_modified, etag)
+        return self.conditional_response(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = instance.updated_date
+        etag = self.make_etag('detail', instance.pk, last_modified)
+        not_modified = get_conditional_response(
+            request, etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified and not self.etag_namespaces else None
+        )
+        if not_modified is not None:
+            return self.conditional_response(not_modified, etag, last_modified)
+        serializer = self.get_serializer(instance)
+        return self.conditional_response(Response(serializer.data), etag, last_modified)
+
+
+class UserResponseCacheMixin:
+    """
+    Cache kết quả list theo người dùng (caching.user_response) cho các danh sách theo vai trò.
+    """
+    cache_namespaces = ('users', 'schedule')
+    cache_timeout = 300
+
+    def list(self, request, *args, **kwargs):
+        data = caching.user_response(
+            request, type(self).__name__,
+            lambda: super(UserResponseCacheMixin, self).list(request, *args, **kwargs).data,
+            namespaces=self.cache_namespaces, timeout=self.cache_timeout
+        )
+        return Response(data)
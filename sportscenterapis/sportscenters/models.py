@@ -14,6 +14,26 @@ class BaseModel(models.Model):
         ordering = ['-id']
 
 
+class SoftDeleteQuerySet(models.QuerySet):
+    def alive(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Manager mặc định chỉ trả về bản ghi chưa bị xóa mềm, with_deleted() trả về tất cả.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().alive()
+
+    def with_deleted(self):
+        return super().get_queryset()
+
+
 class User(AbstractUser):
     ROLE_CHOICES = [
         ('admin', 'Admin'),
@@ -53,6 +73,23 @@ class Member(User):
     class Meta:
         verbose_name = 'Member'
         verbose_name_plural = 'Members'
+        indexes = [
+            models.Index(fields=['join_date']),
+            models.Index(fields=['cancellation_date']),
+        ]
+
+# Bảng từ khóa tìm kiếm hội viên (đã bỏ dấu, dùng cho tìm kiếm theo tiền tố/trigram)
+class MemberSearchTerm(models.Model):
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"{self.member_id} - {self.term}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'member']),
+        ]
 
 # Bảng huấn luyện viên
 class Trainer(User):
@@ -109,6 +146,8 @@ class Class(BaseModel):
     status = models.CharField(max_length=20, choices=[('active', 'Active'), ('cancelled', 'Cancelled'), ('completed', 'Completed')])
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    objects = SoftDeleteManager()
+
 
     def __str__(self):
         return self.name
@@ -116,6 +155,10 @@ class Class(BaseModel):
     class Meta:
         verbose_name = 'Class'
         verbose_name_plural = 'Classes'
+        indexes = [
+            models.Index(fields=['trainer', 'deleted_at', 'start_time']),
+            models.Index(fields=['deleted_at', 'start_time']),
+        ]
 
 # Bảng đăng ký lớp học
 class Enrollment(BaseModel):
@@ -126,6 +169,15 @@ class Enrollment(BaseModel):
     def __str__(self):
         return f"{self.member.username} - {self.gym_class.name}"
 
+    class Meta(BaseModel.Meta):
+        constraints = [
+            # Đồng thời là index (member, gym_class)
+            models.UniqueConstraint(fields=['member', 'gym_class'], name='unique_enrollment_member_class'),
+        ]
+        indexes = [
+            models.Index(fields=['gym_class', 'status', 'member']),
+        ]
+
 
 # Bảng tiến độ tập luyện
 class Progress(BaseModel):
@@ -151,6 +203,13 @@ class Appointment(BaseModel):
     def __str__(self):
         return f"{self.member.username} - {self.date_time}"
 
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(fields=['trainer', 'date_time']),
+            models.Index(fields=['member', 'date_time']),
+            models.Index(fields=['date_time']),
+        ]
+
 # Bảng thanh toán
 class Payment(models.Model):
     PAYMENT_METHODS = [
@@ -169,6 +228,11 @@ class Payment(models.Model):
     def __str__(self):
         return f"{self.member.username} - {self.status}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'date_paid']),
+        ]
+
 # Bảng thông báo
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
@@ -186,6 +250,11 @@ class Notification(models.Model):
     def __str__(self):
         return f"{self.member.username} - {self.type}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['member', 'is_read', 'created_at']),
+        ]
+
 # Bảng tin nội bộ
 class InternalNews(BaseModel):
     author = models.ForeignKey(Trainer, on_delete=models.CASCADE)
@@ -212,4 +281,10 @@ class Statistic(models.Model):
     class_id = models.ForeignKey(Class, on_delete=models.CASCADE, null=True, blank=True)
     enrollment_count = models.IntegerField(default=0)
     attendance_rate = models.FloatField(default=0.0)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['period_type', 'class_id', 'period_start']),
+            models.Index(fields=['period_end']),
+        ]
\ No newline at end of file
@@ -0,0 +1,157 @@
+import logging
+import queue
+import threading
+import uuid
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+from .models import Member, Enrollment, Notification
+
+'''
+Gửi thông báo hàng loạt theo nhóm hội viên.
+Request chỉ xếp job vào hàng đợi trong tiến trình, một worker nền lấy id hội viên
+theo từng khối (keyset theo pk) và bulk_create từng lô nên bộ nhớ không phụ thuộc
+số hội viên. Tiến độ lưu trong cache dùng chung để worker nào cũng đọc được.
+'''
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS = ('active_members', 'class', 'unpaid')
+BATCH_SIZE = 1000
+PROGRESS_TIMEOUT = 24 * 3600
+# Bộ đếm chưa đọc có thể lệch khi ghi đồng thời nên chỉ giữ trong thời gian ngắn
+UNREAD_TIMEOUT = 300
+
+FANOUT_QUEUE = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def segment_queryset(segment, gym_class_id=None):
+    """
+    Queryset id hội viên của nhóm, sắp theo id để duyệt theo khối.
+    """
+    if segment == 'active_members':
+        queryset = Member.objects.filter(active=True)
+    elif segment == 'unpaid':
+        queryset = Member.objects.filter(active=True, payment_status='unpaid')
+    elif segment == 'class':
+        queryset = Member.objects.filter(pk__in=Enrollment.objects.filter(
+            gym_class_id=gym_class_id, status='approved').values('member_id'))
+    else:
+        raise ValueError(f'Unknown segment: {segment}')
+    return queryset.order_by('pk').values_list('pk', flat=True)
+
+
+def unread_key(member_id):
+    return f'unread:{member_id}'
+
+
+def unread_count(member_id):
+    """
+    Số thông báo chưa đọc, đọc từ cache; thiếu thì đếm theo index (member, is_read).
+    """
+    count = cache.get(unread_key(member_id))
+    if count is None:
+        count = Notification.objects.filter(member_id=member_id, is_read=False).count()
+        cache.add(unread_key(member_id), count, timeout=UNREAD_TIMEOUT)
+    return count
+
+
+def incr_unread(member_id, delta=1):
+    try:
+        cache.incr(unread_key(member_id), delta)
+    except ValueError:
+        # Chưa có trong cache: lần đọc sau sẽ đếm lại
+        pass
+
+
+def reset_unread(*member_ids):
+    cache.delete_many([unread_key(member_id) for member_id in member_ids])
+
+
+def mark_all_read(member_id):
+    updated = Notification.objects.filter(member_id=member_id, is_read=False).update(is_read=True)
+    cache.set(unread_key(member_id), 0, timeout=UNREAD_TIMEOUT)
+    return updated
+
+
+def progress_key(job_id):
+    return f'fanout:{job_id}'
+
+
+def get_progress(job_id):
+    return cache.get(progress_key(job_id))
+
+
+def set_progress(job_id, **fields):
+    progress = get_progress(job_id) or {'job_id': job_id}
+    progress.update(fields, updated_at=timezone.now().isoformat())
+    cache.set(progress_key(job_id), progress, timeout=PROGRESS_TIMEOUT)
+    return progress
+
+
+def ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=worker, name='notification-fanout', daemon=True)
+            _worker.start()
+
+
+def start_fanout(segment, type, message, gym_class_id=None):
+    """
+    Xếp job gửi thông báo vào hàng đợi, trả về tiến độ ban đầu (có job_id).
+    """
+    job_id = uuid.uuid4().hex
+    progress = set_progress(job_id, segment=segment, gym_class=gym_class_id, type=type,
+                            status='queued', total=None, sent=0)
+    FANOUT_QUEUE.put({
+        'job_id': job_id,
+        'segment': segment,
+        'gym_class_id': gym_class_id,
+        'type': type,
+        'message': message
+    })
+    ensure_worker()
+    return progress
+
+
+def run_fanout(job):
+    job_id = job['job_id']
+    member_ids = segment_queryset(job['segment'], job['gym_class_id'])
+    total = member_ids.count()
+    set_progress(job_id, status='running', total=total)
+
+    sent = 0
+    last_id = 0
+    while True:
+        chunk = list(member_ids.filter(pk__gt=last_id)[:BATCH_SIZE])
+        if not chunk:
+            break
+        Notification.objects.bulk_create([
+            Notification(member_id=member_id, type=job['type'], message=job['message'])
+            for member_id in chunk
+        ])
+        # bulk_create không phát signal nên xóa bộ đếm chưa đọc của cả khối
+        reset_unread(*chunk)
+        sent += len(chunk)
+        last_id = chunk[-1]
+        set_progress(job_id, sent=sent)
+
+    set_progress(job_id, status='done', sent=sent)
+    return sent
+
+
+def worker():
+    while True:
+        job = FANOUT_QUEUE.get()
+        try:
+            run_fanout(job)
+        except Exception:
+            logger.exception('Notification fan-out %s failed', job['job_id'])
+            set_progress(job['job_id'], status='failed')
+        finally:
+            # Worker chạy lâu nên phải tự đóng kết nối DB như cuối mỗi request
+            close_old_connections()
+            FANOUT_QUEUE.task_done()
@@ -1,4 +1,29 @@
 from rest_framework import pagination
 
 class StandardResultsSetPagination(pagination.PageNumberPagination):
-    page_size = 4
\ No newline at end of file
+    page_size = 4
+
+
+class CursorResultsSetPagination(pagination.CursorPagination):
+    """
+    Phân trang keyset theo (-id): không dùng OFFSET và không COUNT(*) nên trang sâu
+    vẫn nhanh như trang đầu. Client chọn page_size (tối đa max_page_size).
+    Request còn gửi ?page= (client cũ) thì vẫn phân trang theo số trang như trước.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-id'
+    legacy_paginator_class = StandardResultsSetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.legacy_paginator = None
+        if self.legacy_paginator_class.page_query_param in request.query_params:
+            self.legacy_paginator = self.legacy_paginator_class()
+            return self.legacy_paginator.paginate_queryset(queryset.order_by(self.ordering), request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.legacy_paginator:
+            return self.legacy_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Max
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .models import Notification
+
+'''
+Kênh đẩy thông báo qua Server-Sent Events (GET /notifications/stream/), chạy dưới ASGI.
+Mỗi kết nối chỉ là một coroutine chờ trên asyncio.Queue nên giữ được hàng nghìn
+kết nối rảnh trên một worker mà không chiếm thread.
+
+Broker trong tiến trình nhận thông báo theo hai đường:
+- publish(): signal post_save gọi sau khi commit, giao ngay cho kết nối cùng tiến trình.
+- poll(): mỗi worker một vòng lặp, mỗi giây một truy vấn lấy thông báo mới của các hội viên
+  đang kết nối (thay cho broker ngoài), bắt được cả bản ghi từ tiến trình khác và bulk_create.
+Mỗi kết nối nhớ các id đã gửi nên thông báo nhận từ cả hai đường chỉ gửi một lần.
+'''
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1  # giây
+HEARTBEAT_INTERVAL = 15  # giây, giữ kết nối qua proxy
+QUEUE_SIZE = 100
+BACKLOG_LIMIT = 100
+SENT_HISTORY = 256
+FIELDS = ('id', 'member_id', 'type', 'message', 'is_read', 'created_at')
+
+
+def as_payload(row):
+    return {
+        'id': row['id'],
+        'member_id': row['member_id'],
+        'type': row['type'],
+        'message': row['message'],
+        'is_read': row['is_read'],
+        'created_at': row['created_at'].isoformat() if row['created_at'] else None
+    }
+
+
+def format_event(payload):
+    return f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+class Broker:
+    def __init__(self):
+        self.subscribers = {}
+        self.loop = None
+        self.poller = None
+        self.last_id = None
+
+    def subscribe(self, member_id):
+        self.loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.setdefault(member_id, set()).add(queue)
+        if self.poller is None or self.poller.done():
+            # Poller mới bắt đầu từ thông báo mới nhất; thông báo bị lỡ chỉ lấy bù qua Last-Event-ID
+            self.last_id = None
+            self.poller = self.loop.create_task(self.poll())
+        return queue
+
+    def unsubscribe(self, member_id, queue):
+        queues = self.subscribers.get(member_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[member_id]
+
+    def deliver(self, payload):
+        for queue in list(self.subscribers.get(payload['member_id'], ())):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # Client đọc quá chậm: bỏ qua, kết nối lại sẽ lấy bù theo Last-Event-ID
+                pass
+
+    def publish(self, payload):
+        """
+        Gọi được từ thread bất kỳ (view đồng bộ, signal).
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed() or payload['member_id'] not in self.subscribers:
+            return
+        loop.call_soon_threadsafe(self.deliver, payload)
+
+    async def poll(self):
+        while self.subscribers:
+            try:
+                await self.poll_once()
+            except Exception:
+                # Lỗi DB (mất kết nối, timeout...) không được làm dừng vòng lặp của cả worker
+                logger.exception('Notification poll failed')
+                await sync_to_async(close_old_connections)()
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def poll_once(self):
+        if self.last_id is None:
+            self.last_id = (await Notification.objects.aaggregate(last_id=Max('id')))['last_id'] or 0
+            return
+        latest = (await Notification.objects.filter(id__gt=self.last_id)
+                  .aaggregate(last_id=Max('id')))['last_id']
+        if not latest:
+            return
+        rows = Notification.objects.filter(
+            id__gt=self.last_id, id__lte=latest, member_id__in=list(self.subscribers)
+        ).order_by('id').values(*FIELDS)
+        async for row in rows:
+            self.deliver(as_payload(row))
+        self.last_id = latest
+
+
+broker = Broker()
+
+
+def authenticate(request):
+    """
+    Xác thực bằng các lớp xác thực mặc định của DRF (OAuth2), chạy trong thread.
+    """
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    return user if user.is_authenticated else None
+
+
+async def event_stream(member_id, queue, backlog):
+    sent = deque(maxlen=SENT_HISTORY)
+    try:
+        yield 'retry: 3000\n\n'
+        for payload in backlog:
+            sent.append(payload['id'])
+            yield format_event(payload)
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if payload['id'] in sent:
+                continue
+            sent.append(payload['id'])
+            yield format_event(payload)
+    finally:
+        broker.unsubscribe(member_id, queue)
+
+
+async def notification_stream(request):
+    user = await sync_to_async(authenticate)(request)
+    if user is None:
+        return JsonResponse({"detail": "Thông tin xác thực không hợp lệ."}, status=401)
+    if user.role != 'member':
+        return JsonResponse({"detail": "Chỉ hội viên mới nhận được thông báo."}, status=403)
+
+    # Đăng ký trước khi lấy bù để không lọt thông báo tạo ra ở giữa
+    queue = broker.subscribe(user.pk)
+    try:
+        backlog = []
+        last_event_id = request.headers.get('Last-Event-ID', '')
+        if last_event_id.isdigit():
+            rows = Notification.objects.filter(
+                member_id=user.pk, id__gt=int(last_event_id)
+            ).order_by('id').values(*FIELDS)[:BACKLOG_LIMIT]
+            backlog = [as_payload(row) async for row in rows]
+    except BaseException:
+        broker.unsubscribe(user.pk, queue)
+        raise
+
+    response = StreamingHttpResponse(event_stream(user.pk, queue, backlog), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
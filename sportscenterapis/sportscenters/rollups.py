@@ -0,0 +1,216 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Class, Enrollment, Statistic
+from .stats import (
+    PERIOD_TRUNC, member_buckets, revenue_buckets, bucket_counts, iter_periods,
+    normalize_period, period_bounds, period_floor, period_last_day, start_of_day, to_date
+)
+
+'''
+Bảng Statistic lưu sẵn số liệu của các kỳ đã đóng:
+- Dòng tổng (class_id = NULL): member_count, new_members, cancelled_members,
+  total_revenue, enrollment_count của cả trung tâm.
+- Dòng theo lớp (class_id != NULL): enrollment_count của lớp, chỉ lưu khi > 0.
+Dòng tổng đồng thời đánh dấu kỳ đó đã được materialize.
+Kỳ đang mở (chứa ngày hôm nay) luôn được tính trực tiếp, không lưu.
+'''
+
+
+def open_period_start(period):
+    return period_floor(timezone.localdate(), period)
+
+
+def enrollment_buckets(period, first_start, last_end):
+    # {(gym_class_id, period_start): {'enrollments': n}}
+    return bucket_counts(
+        Enrollment.objects.filter(
+            created_date__gte=start_of_day(first_start),
+            created_date__lt=start_of_day(last_end + timedelta(days=1)),
+        ),
+        'created_date', period, 'gym_class_id',
+        enrollments=Count('id'),
+    )
+
+
+def materialize(period, start_date, end_date):
+    """
+    Tính lại và ghi đè các kỳ đã đóng nằm trong [start_date, end_date].
+    Số truy vấn không phụ thuộc số kỳ. Trả về số kỳ đã ghi.
+    """
+    period = normalize_period(period)
+    first_start, last_end = period_bounds(period, start_date, end_date)
+    last_end = min(last_end, open_period_start(period) - timedelta(days=1))
+    if last_end < first_start:
+        return 0
+
+    members = member_buckets(period, first_start, last_end)
+    revenue = {row['period_start']: row['total_revenue'] for row in revenue_buckets(period, first_start, last_end)}
+    enrollments = enrollment_buckets(period, first_start, last_end)
+
+    enrollment_totals = {}
+    rows = []
+    for (class_id, period_start), counts in enrollments.items():
+        enrollment_totals[period_start] = enrollment_totals.get(period_start, 0) + counts['enrollments']
+        rows.append(Statistic(
+            period_type=period,
+            period_start=period_start,
+            period_end=period_last_day(period_start, period),
+            class_id_id=class_id,
+            enrollment_count=counts['enrollments'],
+        ))
+    for stat in members:
+        rows.append(Statistic(
+            period_type=period,
+            period_start=stat['period_start'],
+            period_end=stat['period_end'],
+            member_count=stat['member_count'],
+            new_members=stat['new_members'],
+            cancelled_members=stat['cancelled_members'],
+            total_revenue=revenue.get(stat['period_start'], 0),
+            enrollment_count=enrollment_totals.get(stat['period_start'], 0),
+        ))
+
+    with transaction.atomic():
+        Statistic.objects.filter(period_type=period, period_start__range=[first_start, last_end]).delete()
+        Statistic.objects.bulk_create(rows, batch_size=1000)
+    return len(members)
+
+
+def invalidate(day):
+    """
+    Xóa các kỳ đã lưu bị ảnh hưởng khi dữ liệu của ngày `day` thay đổi.
+    member_count là số cộng dồn nên mọi kỳ từ `day` trở đi đều phải tính lại.
+    """
+    Statistic.objects.filter(period_end__gte=day).delete()
+
+
+def ensure_materialized(period, first_start, last_end):
+    """
+    Materialize các kỳ đã đóng còn thiếu trong khoảng. Trả về các dòng tổng
+    {period_start: Statistic}.
+    """
+    closed_end = min(last_end, open_period_start(period) - timedelta(days=1))
+    if closed_end < first_start:
+        return {}
+
+    def load():
+        return {stat.period_start: stat for stat in Statistic.objects.filter(
+            period_type=period, class_id__isnull=True, period_start__range=[first_start, closed_end])}
+
+    rows = load()
+    missing = [start for start, end in iter_periods(period, first_start, closed_end) if start not in rows]
+    if missing:
+        materialize(period, missing[0], closed_end)
+        rows = load()
+    return rows
+
+
+def member_stats(period, start_date, end_date):
+    """
+    Thống kê hội viên: kỳ đã đóng đọc từ Statistic, kỳ đang mở tính trực tiếp.
+    """
+    period = normalize_period(period)
+    first_start, last_end = period_bounds(period, start_date, end_date)
+    rows = ensure_materialized(period, first_start, last_end)
+
+    stats = [{
+        'period_start': stat.period_start,
+        'period_end': stat.period_end,
+        'member_count': stat.member_count,
+        'new_members': stat.new_members,
+        'cancelled_members': stat.cancelled_members
+    } for stat in sorted(rows.values(), key=lambda stat: stat.period_start)]
+
+    open_start = open_period_start(period)
+    if last_end >= open_start:
+        stats += member_buckets(period, max(first_start, open_start), last_end)
+    return stats
+
+
+def revenue_stats(period, start_date, end_date):
+    """
+    Thống kê doanh thu: kỳ đã đóng đọc từ Statistic, kỳ đang mở tính trực tiếp.
+    """
+    period = normalize_period(period)
+    first_start, last_end = period_bounds(period, start_date, end_date)
+    rows = ensure_materialized(period, first_start, last_end)
+
+    stats = [{
+        'period_start': stat.period_start,
+        'period_end': stat.period_end,
+        'total_revenue': stat.total_revenue
+    } for stat in sorted(rows.values(), key=lambda stat: stat.period_start)]
+
+    open_start = open_period_start(period)
+    if last_end >= open_start:
+        stats += revenue_buckets(period, max(first_start, open_start), last_end)
+    return stats
+
+
+def class_stats(period, start_date, end_date, by_period=False):
+    """
+    Thống kê đăng ký theo lớp: cộng các dòng theo lớp của kỳ đã đóng
+    với số đăng ký của kỳ đang mở.
+    total_enrollments tính đúng theo [start_date, end_date]: các kỳ nằm trọn trong khoảng lấy
+    từ số liệu theo kỳ, phần lẻ ở hai đầu đếm trực tiếp. Chỉ danh sách 'periods' mới căn theo kỳ.
+    """
+    period = normalize_period(period)
+    start, end = to_date(start_date), to_date(end_date)
+    first_start, last_end = period_bounds(period, start, end)
+    ensure_materialized(period, first_start, last_end)
+
+    per_period = {
+        (class_id, period_start): enrollment_count
+        for class_id, period_start, enrollment_count in Statistic.objects.filter(
+            period_type=period, class_id__isnull=False, period_start__range=[first_start, last_end]
+        ).values_list('class_id', 'period_start', 'enrollment_count')
+    }
+    open_start = open_period_start(period)
+    if last_end >= open_start:
+        for key, counts in enrollment_buckets(period, max(first_start, open_start), last_end).items():
+            per_period[key] = counts['enrollments']
+
+    periods = list(iter_periods(period, first_start, last_end))
+    whole = {period_start for period_start, period_end in periods if start <= period_start and period_end <= end}
+    totals = {}
+    for (class_id, period_start), count in per_period.items():
+        if period_start in whole:
+            totals[class_id] = totals.get(class_id, 0) + count
+
+    # Các đoạn lẻ (kỳ bị khoảng ngày cắt ngang) gom vào một truy vấn GROUP BY
+    partial = Q()
+    for period_start, period_end in periods:
+        if period_start not in whole:
+            partial |= Q(created_date__gte=start_of_day(max(period_start, start)),
+                         created_date__lt=start_of_day(min(period_end, end) + timedelta(days=1)))
+    if partial:
+        for row in (Enrollment.objects.filter(partial).order_by()
+                    .values('gym_class_id').annotate(enrollments=Count('id'))):
+            totals[row['gym_class_id']] = totals.get(row['gym_class_id'], 0) + row['enrollments']
+
+    for row in Class.objects.order_by('id').values('id', 'name').iterator(chunk_size=2000):
+        stat = {
+            'class_id': row['id'],
+            'class_name': row['name'],
+            'total_enrollments': totals.get(row['id'], 0)
+        }
+        if by_period:
+            stat['periods'] = [{
+                'period_start': period_start,
+                'period_end': period_end,
+                'enrollments': per_period.get((row['id'], period_start), 0)
+            } for period_start, period_end in periods]
+        yield stat
+
+
+def rollup(periods=None, since=None):
+    """
+    Materialize toàn bộ các kỳ đã đóng từ ngày `since` đến nay.
+    """
+    since = since or timezone.localdate() - timedelta(days=365)
+    result = {}
+    for period in periods or PERIOD_TRUNC:
+        result[period] = materialize(period, since, timezone.localdate())
+    return result
@@ -0,0 +1,177 @@
+import hashlib
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from . import caching
+from .models import User, Class, Appointment, Enrollment
+from .stats import start_of_day
+
+'''
+Lịch của HLV / hội viên trong một khoảng thời gian, gộp lớp học và lịch tư vấn.
+Kết quả được cache theo từng ngày nên lịch một tuần thường chỉ đọc cache;
+các ngày chưa có trong cache được tính chung bằng một truy vấn cho mỗi bảng.
+'''
+
+APPOINTMENT_DURATION = timedelta(hours=1)
+# Lớp học được giả định không kéo dài quá một ngày, dùng làm cận dưới cho start_time
+# để truy vấn giao khoảng thời gian đi theo index (deleted_at/trainer, start_time)
+MAX_CLASS_DURATION = timedelta(days=1)
+MAX_WINDOW = timedelta(days=31)
+CACHE_TIMEOUT = 3600
+
+
+def class_overlaps(start, end):
+    return Q(start_time__lt=end, start_time__gt=start - MAX_CLASS_DURATION, end_time__gt=start)
+
+
+def appointment_overlaps(start, end):
+    return Q(date_time__lt=end, date_time__gt=start - APPOINTMENT_DURATION)
+
+
+def fetch_items(start, end, trainer_ids=(), member_ids=()):
+    """
+    Lấy các lớp học và lịch tư vấn giao với [start, end) của các HLV / hội viên đã chọn
+    (không chọn thì lấy tất cả). Mỗi bảng một truy vấn.
+    """
+    classes = Class.objects.filter(class_overlaps(start, end))
+    appointments = Appointment.objects.filter(appointment_overlaps(start, end))
+
+    if trainer_ids or member_ids:
+        class_filter = Q(pk__in=[])
+        appointment_filter = Q(pk__in=[])
+        if trainer_ids:
+            class_filter |= Q(trainer_id__in=trainer_ids)
+            appointment_filter |= Q(trainer_id__in=trainer_ids)
+        if member_ids:
+            class_filter |= Q(Exists(Enrollment.objects.filter(
+                gym_class_id=OuterRef('pk'), member_id__in=member_ids, status='approved')))
+            appointment_filter |= Q(member_id__in=member_ids)
+        classes = classes.filter(class_filter)
+        appointments = appointments.filter(appointment_filter)
+
+    items = [{
+        'type': 'class',
+        'id': row['id'],
+        'name': row['name'],
+        'trainer': row['trainer_id'],
+        'member': None,
+        'status': row['status'],
+        'start_time': row['start_time'],
+        'end_time': row['end_time']
+    } for row in classes.values('id', 'name', 'trainer_id', 'status', 'start_time', 'end_time')]
+    items += [{
+        'type': 'appointment',
+        'id': row['id'],
+        'name': None,
+        'trainer': row['trainer_id'],
+        'member': row['member_id'],
+        'status': None,
+        'start_time': row['date_time'],
+        'end_time': row['date_time'] + APPOINTMENT_DURATION
+    } for row in appointments.values('id', 'trainer_id', 'member_id', 'date_time')]
+    return items
+
+
+def day_key(day, trainer_ids, member_ids, version):
+    scope = hashlib.md5(
+        f"{sorted(trainer_ids)}|{sorted(member_ids)}".encode()
+    ).hexdigest()
+    return f"schedule:v{version}:{day}:{scope}"
+
+
+def get_schedule(start, end, trainer_ids=(), member_ids=()):
+    """
+    Lịch trong [start, end), sắp xếp theo thời gian bắt đầu.
+    """
+    start_day = timezone.localtime(start).date()
+    end_day = timezone.localtime(end - timedelta(microseconds=1)).date()
+    days = [start_day + timedelta(days=i) for i in range((end_day - start_day).days + 1)]
+
+    version = caching.get_version('schedule')
+    keys = {day: day_key(day, trainer_ids, member_ids, version) for day in days}
+    cached = cache.get_many(list(keys.values()))
+    missing = [day for day in days if keys[day] not in cached]
+    caching.record('schedule', 'misses' if missing else 'hits')
+
+    buckets = {day: cached[keys[day]] for day in days if keys[day] in cached}
+    if missing:
+        # Tính một lần cho khoảng bao các ngày còn thiếu rồi chia về từng ngày
+        fetched = fetch_items(start_of_day(missing[0]), start_of_day(missing[-1] + timedelta(days=1)),
+                              trainer_ids, member_ids)
+        for day in missing:
+            lower, upper = start_of_day(day), start_of_day(day + timedelta(days=1))
+            buckets[day] = [item for item in fetched
+                            if item['start_time'] < upper and item['end_time'] > lower]
+        cache.set_many({keys[day]: buckets[day] for day in missing}, timeout=CACHE_TIMEOUT)
+
+    items = {}
+    for day in days:
+        for item in buckets[day]:
+            if item['start_time'] < end and item['end_time'] > start:
+                items[(item['type'], item['id'])] = item
+    return sorted(items.values(), key=lambda item: (item['start_time'], item['type'], item['id']))
+
+
+def trainer_busy(trainer_id, start, end, exclude_class=None, exclude_appointment=None):
+    """
+    Các lớp học (trừ lớp đã hủy) và lịch tư vấn của HLV giao với [start, end).
+    Mỗi bảng một truy vấn theo index (trainer, ...), dừng ở dòng đầu tiên.
+    """
+    classes = Class.objects.filter(class_overlaps(start, end), trainer_id=trainer_id).exclude(status='cancelled')
+    appointments = Appointment.objects.filter(appointment_overlaps(start, end), trainer_id=trainer_id)
+    if exclude_class:
+        classes = classes.exclude(pk=exclude_class)
+    if exclude_appointment:
+        appointments = appointments.exclude(pk=exclude_appointment)
+    return [
+        ('class', pk) for pk in classes.values_list('id', flat=True)[:1]
+    ] + [
+        ('appointment', pk) for pk in appointments.values_list('id', flat=True)[:1]
+    ]
+
+
+def ensure_trainer_available(trainer_id, start, end, exclude_class=None, exclude_appointment=None):
+    """
+    Khóa dòng HLV rồi kiểm tra trùng lịch, phải gọi trong transaction.atomic()
+    và giữ transaction đến khi lưu xong để hai lượt đặt đồng thời không cùng lọt qua.
+    """
+    if end < start:
+        raise ValidationError({"end_time": "Thời gian kết thúc phải sau thời gian bắt đầu."})
+    if end - start > MAX_CLASS_DURATION:
+        raise ValidationError({"end_time": "Lớp học không được kéo dài quá một ngày."})
+
+    User.objects.select_for_update().filter(pk=trainer_id).values_list('id', flat=True).first()
+    busy = trainer_busy(trainer_id, start, end, exclude_class, exclude_appointment)
+    if busy:
+        kind, pk = busy[0]
+        label = 'lớp học' if kind == 'class' else 'lịch tư vấn'
+        raise ValidationError({"detail": f"Huấn luyện viên đã có {label} #{pk} trùng thời gian."})
+
+
+def find_conflicts(start, end, trainer_ids=()):
+    """
+    Tất cả các cặp lịch trùng nhau của từng HLV trong [start, end) (dùng cho kiểm tra định kỳ).
+    Lấy dữ liệu bằng một truy vấn mỗi bảng rồi quét theo thời gian bắt đầu.
+    """
+    items = [item for item in fetch_items(start, end, trainer_ids)
+             if item['status'] != 'cancelled']
+    items.sort(key=lambda item: (item['trainer'], item['start_time'], item['end_time']))
+
+    conflicts = []
+    active = []
+    current_trainer = None
+    for item in items:
+        if item['trainer'] != current_trainer:
+            current_trainer, active = item['trainer'], []
+        # Bỏ các lịch đã kết thúc trước khi lịch này bắt đầu
+        active = [other for other in active if other['end_time'] > item['start_time']]
+        for other in active:
+            conflicts.append({
+                'trainer': item['trainer'],
+                'first': {key: other[key] for key in ('type', 'id', 'start_time', 'end_time')},
+                'second': {key: item[key] for key in ('type', 'id', 'start_time', 'end_time')}
+            })
+        active.append(item)
+    return conflicts
@@ -0,0 +1,126 @@
+import re
+import unicodedata
+from django.db.models import Count, Q
+from rest_framework import filters
+from .models import Member, MemberSearchTerm
+
+'''
+Tìm kiếm hội viên qua bảng MemberSearchTerm thay cho ILIKE '%term%' trên nhiều cột:
+- Mỗi hội viên được tách thành các từ đã chuẩn hóa (bỏ dấu tiếng Việt, chữ thường)
+  từ họ tên, username, email và số điện thoại; tìm theo tiền tố trên index.
+- Thêm các trigram của từng từ (lưu với tiền tố '#') để tìm theo chuỗi con (ví dụ 4 số cuối điện thoại).
+Bảng được cập nhật khi lưu User/Member (signals) và có thể dựng lại bằng lệnh reindex_members.
+'''
+
+SEARCH_FIELDS = ['first_name', 'last_name', 'full_name', 'username', 'email', 'phone']
+MAX_TERM_LENGTH = 64
+
+
+def fold(text):
+    text = unicodedata.normalize('NFD', text or '').replace('đ', 'd').replace('Đ', 'D')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    # Ghép các nhóm số bị ngăn bởi khoảng trắng, dấu chấm, gạch (số điện thoại)
+    return re.sub(r'(?<=\d)[\s.\-]+(?=\d)', '', text)
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in re.findall(r'[a-z0-9]+', fold(text))]
+
+
+TRIGRAM_MARK = '#'  # từ khóa chỉ gồm [a-z0-9] nên trigram không khớp tiền tố của từ nào
+
+
+def trigrams(token):
+    return {TRIGRAM_MARK + token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def member_terms(member):
+    """
+    Các từ khóa (từ và trigram) của một hội viên.
+    """
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        tokens.update(tokenize(getattr(member, field, '')))
+
+    grams = set()
+    for token in tokens:
+        grams.update(trigrams(token))
+    return tokens | grams
+
+
+def index_member(member):
+    """
+    Ghi lại các từ khóa tìm kiếm của một hội viên.
+    """
+    MemberSearchTerm.objects.filter(member_id=member.pk).delete()
+    MemberSearchTerm.objects.bulk_create(
+        [MemberSearchTerm(member_id=member.pk, term=term) for term in member_terms(member)]
+    )
+
+
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def prefix_upper_bound(token):
+    """
+    Chuỗi nhỏ nhất lớn hơn mọi từ có tiền tố token, chỉ dùng ký tự trong ALPHABET;
+    None nếu không có (token toàn 'z').
+    """
+    token = token.rstrip(ALPHABET[-1])
+    if not token:
+        return None
+    return token[:-1] + ALPHABET[ALPHABET.index(token[-1]) + 1]
+
+
+def prefix_terms(token):
+    # Tiền tố viết dưới dạng khoảng [token, cận trên) để dùng index trên cả MySQL lẫn SQLite
+    # (LIKE không phân biệt hoa thường trên SQLite không dùng được index). Cận trên chỉ gồm
+    # [0-9a-z], có cùng thứ tự (số trước chữ) với collation nhị phân và utf8mb4_0900_ai_ci
+    upper = prefix_upper_bound(token)
+    terms = MemberSearchTerm.objects.filter(term__gte=token)
+    if upper:
+        terms = terms.filter(term__lt=upper)
+    return terms
+
+
+def search_members(queryset, query):
+    """
+    Lọc queryset hội viên: mỗi từ trong query phải khớp tiền tố một từ khóa.
+    Trigram (chứa đủ các trigram của từ) chỉ dùng khi cần tìm theo chuỗi con: từ có chữ số
+    (đuôi số điện thoại) hoặc không hội viên nào khớp tiền tố. Từ phổ biến như "nguyen" khớp
+    tiền tố nên không phải gom nhóm các dòng trigram của phần lớn hội viên.
+    """
+    for token in tokenize(query):
+        prefix = prefix_terms(token).values('member_id')
+        grams = trigrams(token)
+        if grams and (any(c.isdigit() for c in token) or not prefix.exists()):
+            contains = (MemberSearchTerm.objects
+                        .filter(term__in=grams)
+                        .values('member_id')
+                        .annotate(matched=Count('term', distinct=True))
+                        .filter(matched=len(grams))
+                        .values('member_id'))
+            queryset = queryset.filter(Q(id__in=prefix) | Q(id__in=contains))
+        else:
+            queryset = queryset.filter(id__in=prefix)
+    return queryset
+
+
+class MemberSearchFilter(filters.SearchFilter):
+    """
+    ?search= cho MemberViewSet, dùng bảng từ khóa đã đánh index.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search_members(queryset, ' '.join(terms))
+
+
+def reindex_all(chunk_size=1000):
+    count = 0
+    for member in Member.objects.only('id', *SEARCH_FIELDS).iterator(chunk_size=chunk_size):
+        index_member(member)
+        count += 1
+    return count
@@ -32,22 +32,23 @@ class ClassSerializer(ModelSerializer):
             'status', 'price', 'is_enrolled'
         ]
 
-    def get_is_enrolled(self, obj):
-        request = self.context.get('request')
-        user = request.user if request else None
-
-        if user and user.is_authenticated and user.role == 'member':
-            try:
-                member = Member.objects.get(pk=user.pk)  # dùng kế thừa đa bảng
-                return Enrollment.objects.filter(
-                    member=member,
-                    gym_class=obj,
+    def get_enrolled_class_ids(self):
+        # Tính một lần cho cả request, dùng chung cho mọi lớp trong trang (context của serializer gốc)
+        enrolled = self.context.get('enrolled_class_ids')
+        if enrolled is None:
+            request = self.context.get('request')
+            user = request.user if request else None
+            enrolled = set()
+            if user and user.is_authenticated and user.role == 'member':
+                enrolled = set(Enrollment.objects.filter(
+                    member_id=user.pk,  # Member dùng chung khóa chính với User (kế thừa đa bảng)
                     status='approved'
-                ).exists()
-            except Member.DoesNotExist:
-                return False
+                ).values_list('gym_class_id', flat=True))
+            self.context['enrolled_class_ids'] = enrolled
+        return enrolled
 
-        return False
+    def get_is_enrolled(self, obj):
+        return obj.pk in self.get_enrolled_class_ids()
 
     def get_trainer_info(self, obj):
         if obj.trainer:
@@ -128,6 +129,23 @@ class EnrollmentSerializer(serializers.ModelSerializer):
             'gym_class',
             'class_detail',
         ]
+        # member được gán trong validate(); trùng đăng ký do ràng buộc unique trong DB và view xử lý
+        validators = []
+
+    STATUSES = ('approved', 'waitlisted')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        # Chỉ lễ tân được đổi trạng thái; hội viên không thể tự duyệt khỏi danh sách chờ
+        if request is None or getattr(request.user, 'role', None) != 'receptionist':
+            fields['status'].read_only = True
+        return fields
+
+    def validate_status(self, value):
+        if value not in self.STATUSES:
+            raise serializers.ValidationError("Trạng thái đăng ký không hợp lệ.")
+        return value
 
     def validate(self, data):
         user = self.context['request'].user
@@ -136,7 +154,8 @@ class EnrollmentSerializer(serializers.ModelSerializer):
             data['member'] = user.member  # lấy instance Member
         elif user.role == 'receptionist':
             if 'member' not in data:
-                raise serializers.ValidationError("Receptionist phải chỉ định học viên.")
+                if self.instance is None:
+                    raise serializers.ValidationError("Receptionist phải chỉ định học viên.")
             elif isinstance(data['member'], User):
                 try:
                     data['member'] = data['member'].member  # chuyển từ User sang Member
@@ -0,0 +1,125 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model
+from . import rollups, caching, search, notifications, push, authentication
+from .models import User, Member, Payment, Enrollment, Class, Appointment, Notification
+
+
+def invalidate_rollups(*days):
+    # Chỉ các kỳ đã đóng mới được lưu trong Statistic, kỳ đang mở luôn tính trực tiếp
+    days = [day.date() if hasattr(day, 'date') else day for day in days if day]
+    open_start = rollups.open_period_start('weekly')
+    closed_days = [day for day in days if day < open_start]
+    if closed_days:
+        rollups.invalidate(min(closed_days))
+
+
+@receiver(pre_save, sender=Member)
+def remember_member_stats_fields(sender, instance, **kwargs):
+    instance._stats_fields = None
+    if instance.pk:
+        instance._stats_fields = Member.objects.filter(pk=instance.pk).values(
+            'active', 'join_date', 'cancellation_date').first()
+
+
+@receiver(post_save, sender=Member)
+def member_saved(sender, instance, created, **kwargs):
+    old = getattr(instance, '_stats_fields', None) or {}
+    new = {
+        'active': instance.active,
+        'join_date': instance.join_date,
+        'cancellation_date': instance.cancellation_date
+    }
+    if old == new:
+        return
+    caching.bump_version('stats')
+    invalidate_rollups(instance.join_date, instance.cancellation_date,
+                       old.get('join_date'), old.get('cancellation_date'))
+
+
+@receiver(post_delete, sender=Member)
+def member_deleted(sender, instance, **kwargs):
+    caching.bump_version('stats')
+    invalidate_rollups(instance.join_date, instance.cancellation_date)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def payment_changed(sender, instance, **kwargs):
+    caching.bump_version('stats')
+    invalidate_rollups(instance.date_paid and timezone.localtime(instance.date_paid))
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, **kwargs):
+    if created:
+        caching.bump_version('stats')
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    caching.bump_version('stats')
+    invalidate_rollups(instance.created_date and timezone.localtime(instance.created_date))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Member)
+def reindex_member_search(sender, instance, update_fields=None, **kwargs):
+    # Chỉ dựng lại từ khóa khi các trường được tìm kiếm có thể đã đổi
+    if update_fields and not set(update_fields) & set(search.SEARCH_FIELDS):
+        return
+    if sender is User:
+        if instance.role != 'member' or not Member.objects.filter(pk=instance.pk).exists():
+            return
+    search.index_member(instance)
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def schedule_changed(sender, **kwargs):
+    caching.bump_version('schedule')
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    if created:
+        if not instance.is_read:
+            notifications.incr_unread(instance.member_id)
+        payload = push.as_payload({field: getattr(instance, field) for field in push.FIELDS})
+        transaction.on_commit(lambda: push.broker.publish(payload))
+    else:
+        # Trạng thái đã đọc có thể đã đổi
+        notifications.reset_unread(instance.member_id)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    notifications.reset_unread(instance.member_id)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Member/Trainer/Receptionist lưu qua lớp con nên không phát signal với sender=User
+    if not isinstance(instance, User):
+        return
+    # Đăng nhập chỉ cập nhật last_login, không ảnh hưởng dữ liệu trả về
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    caching.bump_version('users')
+    # User được cache cùng token xác thực: chỉ làm mới cache xác thực của chính người này
+    authentication.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=get_access_token_model())
+@receiver(post_delete, sender=get_access_token_model())
+def access_token_changed(sender, instance, created=False, **kwargs):
+    # Token mới chưa có trong cache; sửa/thu hồi (revoke = delete) thì chỉ bỏ mục của token này
+    if not created:
+        authentication.invalidate_token(instance.token, instance.user_id)
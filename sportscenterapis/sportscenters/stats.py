@@ -0,0 +1,164 @@
+from datetime import date, datetime, time, timedelta
+from django.db.models import Count, Q, Sum, DateField
+from django.db.models.functions import TruncWeek, TruncMonth, TruncYear
+from django.utils import timezone
+from .models import Member, Payment
+
+PERIOD_TRUNC = {
+    'weekly': TruncWeek,
+    'monthly': TruncMonth,
+    'yearly': TruncYear,
+}
+
+
+def normalize_period(period):
+    # Chu kỳ không hợp lệ thì mặc định theo tháng (giống hành vi cũ)
+    return period if period in PERIOD_TRUNC else 'monthly'
+
+
+def to_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def period_floor(day, period):
+    """
+    Ngày bắt đầu của kỳ (tuần ISO / tháng / năm) chứa `day`.
+    """
+    if period == 'weekly':
+        return day - timedelta(days=day.weekday())
+    if period == 'yearly':
+        return date(day.year, 1, 1)
+    return date(day.year, day.month, 1)
+
+
+def next_period(day, period):
+    """
+    Ngày bắt đầu của kỳ kế tiếp, `day` phải là đầu kỳ.
+    """
+    if period == 'weekly':
+        return day + timedelta(days=7)
+    if period == 'yearly':
+        return date(day.year + 1, 1, 1)
+    if day.month == 12:
+        return date(day.year + 1, 1, 1)
+    return date(day.year, day.month + 1, 1)
+
+
+def period_last_day(day, period):
+    return next_period(period_floor(day, period), period) - timedelta(days=1)
+
+
+def iter_periods(period, start_date, end_date):
+    """
+    Sinh các kỳ (period_start, period_end) theo lịch phủ [start_date, end_date].
+    period_end là ngày cuối cùng của kỳ nên các kỳ không chồng lên nhau.
+    """
+    current = period_floor(to_date(start_date), period)
+    end_date = to_date(end_date)
+    while current <= end_date:
+        following = next_period(current, period)
+        yield current, following - timedelta(days=1)
+        current = following
+
+
+def period_bounds(period, start_date, end_date):
+    """
+    Khoảng [đầu kỳ đầu tiên, cuối kỳ cuối cùng] đã căn theo lịch, dùng làm khóa cache
+    để các request có ngày khác nhau trong cùng kỳ dùng chung kết quả.
+    """
+    period = normalize_period(period)
+    first_start = period_floor(to_date(start_date), period)
+    last_end = period_last_day(to_date(end_date), period)
+    return first_start, last_end
+
+
+def bucket_counts(queryset, field, period, *group_by, **aggregates):
+    """
+    Gom nhóm queryset theo kỳ của `field` (và các cột `group_by`) trong một truy vấn GROUP BY.
+    Trả về dict {period_start: {alias: value}}, hoặc {(cột..., period_start): {...}} khi có group_by.
+    """
+    trunc = PERIOD_TRUNC[period]
+    rows = (queryset.order_by()
+            .annotate(bucket=trunc(field, output_field=DateField()))
+            .values(*group_by, 'bucket')
+            .annotate(**aggregates))
+    if not group_by:
+        return {to_date(row.pop('bucket')): row for row in rows}
+    return {
+        tuple(row.pop(col) for col in group_by) + (to_date(row.pop('bucket')),): row
+        for row in rows
+    }
+
+
+def member_buckets(period, start_date, end_date):
+    """
+    Tính member_count, new_members, cancelled_members cho toàn bộ khoảng thời gian
+    với số truy vấn cố định (không phụ thuộc số kỳ).
+    """
+    period = normalize_period(period)
+    periods = list(iter_periods(period, start_date, end_date))
+    if not periods:
+        return []
+
+    first_start, last_end = periods[0][0], periods[-1][1]
+
+    # Số hội viên đang hoạt động đã tham gia trước kỳ đầu tiên
+    member_count = Member.objects.filter(active=True, join_date__lt=first_start).count()
+
+    joined = bucket_counts(
+        Member.objects.filter(join_date__range=[first_start, last_end]),
+        'join_date', period,
+        new_members=Count('id'),
+        new_active=Count('id', filter=Q(active=True)),
+    )
+    cancelled = bucket_counts(
+        Member.objects.filter(cancellation_date__range=[first_start, last_end]),
+        'cancellation_date', period,
+        cancelled_members=Count('id'),
+    )
+
+    stats = []
+    for period_start, period_end in periods:
+        joined_row = joined.get(period_start, {})
+        # Cộng dồn để ra tổng hội viên tính đến cuối kỳ
+        member_count += joined_row.get('new_active', 0)
+        stats.append({
+            'period_start': period_start,
+            'period_end': period_end,
+            'member_count': member_count,
+            'new_members': joined_row.get('new_members', 0),
+            'cancelled_members': cancelled.get(period_start, {}).get('cancelled_members', 0),
+        })
+    return stats
+
+
+def revenue_buckets(period, start_date, end_date):
+    """
+    Tổng doanh thu theo kỳ bằng một truy vấn GROUP BY, kỳ trống được điền 0.
+    """
+    period = normalize_period(period)
+    periods = list(iter_periods(period, start_date, end_date))
+    if not periods:
+        return []
+
+    first_start, last_end = periods[0][0], periods[-1][1]
+    revenue = bucket_counts(
+        Payment.objects.filter(
+            status='success',
+            date_paid__gte=start_of_day(first_start),
+            date_paid__lt=start_of_day(last_end + timedelta(days=1)),
+        ),
+        'date_paid', period,
+        total_revenue=Sum('amount'),
+    )
+
+    return [{
+        'period_start': period_start,
+        'period_end': period_end,
+        'total_revenue': revenue.get(period_start, {}).get('total_revenue') or 0
+    } for period_start, period_end in periods]
+
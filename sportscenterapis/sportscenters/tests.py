@@ -1,3 +1,389 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
+from rest_framework.test import APIClient
+from sportscenters.management.commands.check_query_plans import full_scans, hot_queries, view_queryset
+from sportscenters import caching, push, rollups, search, stats, views
+from sportscenters.models import Class, Enrollment, Member, Notification, Payment, Receptionist, Trainer, User
 
-# Create your tests here.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(username='member', role='member')
+        cls.trainer = Trainer.objects.create(username='trainer', role='trainer')
+        cls.receptionist = Receptionist.objects.create(username='receptionist', role='receptionist')
+        cls.gym_class = Class.objects.create(name='Yoga', description='', trainer=cls.trainer,
+                                             max_members=10, status='active', price=100)
+
+    def test_hot_queries_use_indexes(self):
+        queries = hot_queries(self.member, self.trainer, self.receptionist, self.gym_class)
+        for name, queryset in queries.items():
+            with self.subTest(query=name):
+                plan = queryset.explain()
+                self.assertEqual(full_scans(plan), [], plan)
+
+
+
+class MemberSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anh = Member.objects.create(username='nva', full_name='Nguyễn Văn Ánh', phone='0901 234 567')
+        cls.binh = Member.objects.create(username='ttb', full_name='Trần Thị Bình', phone='0987654321')
+        for i in range(20):
+            Member.objects.create(username=f'nguyen{i}', full_name=f'Nguyễn Thị {i}')
+
+    def search(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            members = list(search.search_members(Member.objects.all(), query))
+        return members, [query['sql'] for query in queries]
+
+    def test_prefix_match_skips_trigram_grouping(self):
+        # Từ phổ biến khớp tiền tố: không gom nhóm trigram (chi phí không tăng theo số hội viên trùng trigram)
+        members, sql = self.search('nguyen')
+        self.assertEqual(len(members), 21)
+        self.assertEqual(len(sql), 2)
+        self.assertFalse(any('HAVING' in statement for statement in sql))
+
+    def test_substring_falls_back_to_trigrams(self):
+        members, sql = self.search('inh')
+        self.assertEqual([member.pk for member in members], [self.binh.pk])
+        self.assertTrue(any('HAVING' in statement for statement in sql))
+
+    def test_phone_suffix_uses_trigrams(self):
+        members, _ = self.search('4567')
+        self.assertEqual([member.pk for member in members], [self.anh.pk])
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryCountTests(TestCase):
+    """
+    Số truy vấn của các danh sách không được tăng theo số dòng trên trang.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(username='member', role='member')
+        cls.trainer = Trainer.objects.create(username='trainer', role='trainer')
+
+    client_class = APIClient
+
+    def add_classes(self, count):
+        classes = [
+            Class.objects.create(name=f'Lớp {Class.objects.count() + 1}', description='', trainer=self.trainer,
+                                 max_members=10, status='active', price=100)
+            for _ in range(count)
+        ]
+        for gym_class in classes:
+            Enrollment.objects.create(member=self.member, gym_class=gym_class)
+        return classes
+
+    def count_queries(self, path):
+        # Các danh sách được cache theo version, bỏ cache để đo đúng truy vấn DB
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, user, path):
+        self.client.force_authenticate(user)
+        self.add_classes(1)
+        expected = self.count_queries(path)
+        # Đủ một trang (page_size = 4) và nhiều hơn một trang
+        self.add_classes(4)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(path).status_code, 200)
+        self.add_classes(3)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(path).status_code, 200)
+
+    def test_class_list(self):
+        self.assert_constant_queries(self.member, '/classes/')
+
+    def test_trainer_class_list(self):
+        self.assert_constant_queries(self.trainer, '/trainer/enrollments/')
+
+    def test_member_enrollment_list(self):
+        self.assert_constant_queries(self.member, '/enrollments/')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class EnrollmentConcurrencyTests(TransactionTestCase):
+    """
+    Nhiều hội viên đăng ký cùng lúc vào lớp chỉ còn một chỗ: đúng một người được duyệt.
+    """
+    WORKERS = 8
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite trong bộ nhớ không cho nhiều thread ghi đồng thời, cần DB dạng file hoặc MySQL.')
+
+    def test_parallel_enrollments_take_last_seat_once(self):
+        trainer = Trainer.objects.create(username='trainer', role='trainer')
+        gym_class = Class.objects.create(name='Yoga', description='', trainer=trainer,
+                                         max_members=5, current_capacity=4, status='active', price=100)
+        members = [Member.objects.create(username=f'member{i}', role='member') for i in range(self.WORKERS)]
+
+        barrier = threading.Barrier(self.WORKERS)
+        responses = []
+        errors = []
+
+        def enroll(member):
+            client = APIClient()
+            client.force_authenticate(member)
+            try:
+                barrier.wait()
+                responses.append(client.post('/enrollments/', {'gym_class': gym_class.pk}))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=enroll, args=(member,)) for member in members]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual([response.status_code for response in responses], [201] * self.WORKERS)
+        statuses = sorted(Enrollment.objects.filter(gym_class=gym_class).values_list('status', flat=True))
+        self.assertEqual(statuses, ['approved'] + ['waitlisted'] * (self.WORKERS - 1))
+        gym_class.refresh_from_db()
+        self.assertEqual(gym_class.current_capacity, gym_class.max_members)
+
+
+class BrokerTests(TestCase):
+    def test_restarted_poller_does_not_replay_old_notifications(self):
+        member = Member.objects.create(username='member', role='member')
+        broker = push.Broker()
+        # Lần kết nối trước đã dừng poller ở đây; các thông báo sau đó đã được đọc
+        broker.last_id = 0
+        Notification.objects.bulk_create([
+            Notification(member=member, type='reminder', message=f'Cũ {i}', is_read=True) for i in range(3)
+        ])
+
+        async def connect():
+            queue = broker.subscribe(member.pk)
+            await asyncio.sleep(0.05)
+            broker.unsubscribe(member.pk, queue)
+            await broker.poller
+            return queue.qsize()
+
+        with mock.patch.object(push, 'POLL_INTERVAL', 0.01):
+            # async_to_sync: ORM async chạy trên thread chính, cùng kết nối/transaction của test
+            self.assertEqual(async_to_sync(connect)(), 0)
+
+
+class FileLockTests(TestCase):
+    def test_lock_files_are_bounded(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}), \
+                mock.patch.object(caching, 'LOCK_SLOTS', 8):
+            for i in range(50):
+                release = caching.acquire_lock(f'lock:responses:{i}')
+                self.assertIsNotNone(release)
+                # Khóa đang giữ thì không lấy lại được
+                self.assertIsNone(caching.acquire_lock(f'lock:responses:{i}'))
+                release()
+            self.assertLessEqual(len(os.listdir(os.path.join(location, 'locks'))), 8)
+
+
+class ClassStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        trainer = Trainer.objects.create(username='trainer', role='trainer')
+        cls.gym_class = Class.objects.create(name='Yoga', description='', trainer=trainer,
+                                             max_members=10, status='active', price=100)
+        for i, day in enumerate([date(2025, 1, 10), date(2025, 1, 17), date(2025, 2, 5)]):
+            member = Member.objects.create(username=f'member{i}', role='member')
+            enrollment = Enrollment.objects.create(member=member, gym_class=cls.gym_class)
+            created = timezone.make_aware(datetime(day.year, day.month, day.day, 12))
+            Enrollment.objects.filter(pk=enrollment.pk).update(created_date=created)
+
+    def total(self, start_date, end_date, by_period=False):
+        stats = list(rollups.class_stats('monthly', start_date, end_date, by_period))
+        return stats[0]
+
+    def test_total_uses_exact_range(self):
+        self.assertEqual(self.total(date(2025, 1, 15), date(2025, 1, 20))['total_enrollments'], 1)
+        self.assertEqual(self.total(date(2025, 1, 15), date(2025, 2, 10))['total_enrollments'], 2)
+        self.assertEqual(self.total(date(2025, 1, 1), date(2025, 2, 28))['total_enrollments'], 3)
+
+    def test_periods_breakdown_snaps_to_whole_periods(self):
+        stat = self.total(date(2025, 1, 15), date(2025, 2, 10), by_period=True)
+        self.assertEqual([(row['period_start'], row['enrollments']) for row in stat['periods']],
+                         [(date(2025, 1, 1), 2), (date(2025, 2, 1), 1)])
+
+
+class StatsBucketTests(TestCase):
+    """
+    member_buckets/revenue_buckets: số truy vấn cố định theo số kỳ và khớp với cách đếm từng kỳ.
+    """
+    PERIODS = ('weekly', 'monthly', 'yearly')
+
+    @classmethod
+    def setUpTestData(cls):
+        start = date(2024, 1, 1)
+        for i in range(60):
+            joined = start + timedelta(days=i * 11)
+            member = Member.objects.create(
+                username=f'member{i}', role='member', active=i % 4 != 0, join_date=joined,
+                cancellation_date=joined + timedelta(days=90) if i % 5 == 0 else None
+            )
+            payment = Payment.objects.create(member=member, amount=Decimal(100 + i), payment_method='momo',
+                                             status='failed' if i % 6 == 0 else 'success', transaction_id=f'tx{i}')
+            paid = timezone.make_aware(datetime(joined.year, joined.month, joined.day, 9))
+            Payment.objects.filter(pk=payment.pk).update(date_paid=paid)
+
+    def brute_force(self, period, start_date, end_date):
+        # Đếm từng kỳ bằng các truy vấn riêng như vòng lặp cũ
+        members, revenue = [], []
+        for period_start, period_end in stats.iter_periods(period, start_date, end_date):
+            members.append({
+                'period_start': period_start,
+                'period_end': period_end,
+                'member_count': Member.objects.filter(active=True, join_date__lte=period_end).count(),
+                'new_members': Member.objects.filter(join_date__range=[period_start, period_end]).count(),
+                'cancelled_members': Member.objects.filter(
+                    cancellation_date__range=[period_start, period_end]).count(),
+            })
+            total = Payment.objects.filter(
+                status='success', date_paid__date__range=[period_start, period_end]
+            ).aggregate(total=Sum('amount'))['total']
+            revenue.append({'period_start': period_start, 'period_end': period_end, 'total_revenue': total or 0})
+        return members, revenue
+
+    def test_buckets_match_per_period_counts(self):
+        for period in self.PERIODS:
+            with self.subTest(period=period):
+                expected_members, expected_revenue = self.brute_force(period, date(2024, 1, 1), date(2025, 12, 31))
+                self.assertEqual(stats.member_buckets(period, date(2024, 1, 1), date(2025, 12, 31)), expected_members)
+                self.assertEqual(stats.revenue_buckets(period, date(2024, 1, 1), date(2025, 12, 31)), expected_revenue)
+
+    def test_query_count_does_not_depend_on_range(self):
+        for period in self.PERIODS:
+            with self.subTest(period=period):
+                with self.assertNumQueries(3):
+                    stats.member_buckets(period, date(2024, 1, 1), date(2024, 1, 31))
+                with self.assertNumQueries(3):
+                    stats.member_buckets(period, date(2024, 1, 1), date(2025, 12, 31))
+                with self.assertNumQueries(1):
+                    stats.revenue_buckets(period, date(2024, 1, 1), date(2024, 1, 31))
+                with self.assertNumQueries(1):
+                    stats.revenue_buckets(period, date(2024, 1, 1), date(2025, 12, 31))
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.receptionist = Receptionist.objects.create(username='receptionist', role='receptionist')
+        for i in range(45):
+            Member.objects.create(username=f'member{i}', role='member')
+
+    def test_cursor_pages_skip_count_and_offset(self):
+        self.client.force_login(self.receptionist)
+        url = '/members/?page_size=10'
+        seen = []
+        query_counts = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            for query in queries:
+                sql = query['sql'].upper()
+                self.assertNotIn('COUNT(', sql)
+                self.assertNotIn('OFFSET', sql)
+            query_counts.append(len(queries))
+            seen.extend(row['id'] for row in response.json()['results'])
+            url = response.json()['next']
+        # Trang sâu tốn số truy vấn như trang đầu, không sót/trùng dòng
+        self.assertEqual(len(set(query_counts)), 1, query_counts)
+        self.assertEqual(sorted(seen, reverse=True), seen)
+        self.assertEqual(len(seen), Member.objects.count())
+
+
+class NotInClassQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.receptionist = Receptionist.objects.create(username='receptionist', role='receptionist')
+        trainer = Trainer.objects.create(username='trainer', role='trainer')
+        cls.gym_class = Class.objects.create(name='Yoga', description='', trainer=trainer,
+                                             max_members=10, status='active', price=100)
+        cls.enrolled = Member.objects.create(username='enrolled', role='member')
+        cls.waitlisted = Member.objects.create(username='waitlisted', role='member')
+        cls.free = Member.objects.create(username='free', role='member')
+        Enrollment.objects.create(member=cls.enrolled, gym_class=cls.gym_class)
+        Enrollment.objects.create(member=cls.waitlisted, gym_class=cls.gym_class, status='waitlisted')
+
+    def test_not_in_class_uses_indexed_not_exists(self):
+        queryset = view_queryset(views.MemberViewSet, self.receptionist, not_in_class=self.gym_class.pk)
+        self.assertIn('NOT EXISTS', str(queryset.query).upper())
+        self.assertEqual(sorted(queryset.values_list('pk', flat=True)), sorted([self.waitlisted.pk, self.free.pk]))
+        # Mỗi hội viên chỉ dò index của Enrollment theo (lớp, hội viên), không quét bảng đăng ký
+        plan = queryset.explain()
+        self.assertNotIn('sportscenters_enrollment', full_scans(plan))
+        if connection.vendor == 'sqlite':
+            probe = [line for line in plan.splitlines() if 'U0' in line]
+            self.assertTrue(probe and all('SEARCH' in line and 'gym_class_id=?' in line and 'member_id=?' in line
+                                          for line in probe), plan)
+        self.assertIn(['gym_class', 'status', 'member'], [index.fields for index in Enrollment._meta.indexes])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheStatsPermissionTests(TestCase):
+    client_class = APIClient
+
+    def test_only_staff_can_read_cache_stats(self):
+        self.assertIn(self.client.get('/stats/cache/?namespace=responses').status_code, (401, 403))
+        self.client.force_authenticate(Member.objects.create(username='member', role='member'))
+        self.assertEqual(self.client.get('/stats/cache/?namespace=responses').status_code, 403)
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        self.assertEqual(self.client.get('/stats/cache/?namespace=responses').status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncViewParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(username='member', role='member')
+        AccessToken.objects.create(user=cls.member, token='member-token', scope='read write',
+                                   expires=timezone.now() + timedelta(hours=1))
+        trainers = [Trainer.objects.create(username=f'trainer{i}', role='trainer') for i in range(2)]
+        for i in range(10):
+            Class.objects.create(name=f'Lớp {i}', description='', trainer=trainers[i % 2],
+                                 max_members=10, status='active', price=100)
+
+    def test_sync_querysets_are_ordered(self):
+        # Không có thứ tự thì trang do DB tự chọn (MySQL có thể khác SQLite) và lệch với bản async
+        self.assertEqual(view_queryset(views.ClassViewSet, self.member).query.order_by, ('id',))
+        self.assertEqual(views.InternalNewsViewSet.queryset.query.order_by, ('id',))
+
+    def test_class_list_pages_match_sync_endpoint(self):
+        headers = {'Authorization': 'Bearer member-token'}
+        for page in ('1', '2', '3'):
+            with self.subTest(page=page):
+                cache.clear()
+                sync = self.client.get('/classes/', {'page': page}, headers=headers)
+                cache.clear()
+                async_ = self.client.get('/async/classes/', {'page': page}, headers=headers)
+                self.assertEqual(sync.status_code, 200)
+                # next/previous chỉ khác đường dẫn (/async/)
+                for key in ('count', 'results'):
+                    self.assertEqual(async_.json()[key], sync.json()[key])
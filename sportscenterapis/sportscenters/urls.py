@@ -1,5 +1,5 @@
 from django.urls import path, include
-from . import views
+from . import views, push, async_views
 from rest_framework import routers
 
 from .views import TrainerClassListView, TrainerStudentListView
@@ -17,10 +17,17 @@ router.register('payments', views.PaymentViewSet, basename='payment')
 router.register('notifications', views.NotificationViewSet, basename='notification')
 router.register('internalnews', views.InternalNewsViewSet, basename='internalnews')
 router.register(r'stats', views.StatisticViewSet, basename='stats')
+router.register('schedule', views.ScheduleViewSet, basename='schedule')
 urlpatterns = [
+    # Đặt trước router để không bị hiểu là chi tiết thông báo có pk = 'stream'
+    path('notifications/stream/', push.notification_stream, name='notification-stream'),
     path('', include(router.urls)),
     path('users/current-user/', views.UserViewSet.get_current_user, name='current_user'),
     path('trainer/enrollments/', TrainerClassListView.as_view(), name='trainer-enrollments'),
     path('trainer/students/', TrainerStudentListView.as_view(), name='trainer-student-list'),
+    path('async/classes/', async_views.class_list, name='async-class-list'),
+    path('async/trainer/enrollments/', async_views.trainer_class_list, name='async-trainer-enrollments'),
+    path('async/internalnews/', async_views.internal_news_list, name='async-internalnews-list'),
+    path('async/users/current-user/', async_views.current_user, name='async-current-user'),
 
 ]
\ No newline at end of file
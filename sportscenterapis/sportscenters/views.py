@@ -1,13 +1,16 @@
-from rest_framework import viewsets, generics, status, parsers, permissions, filters
+from rest_framework import viewsets, generics, status, parsers, permissions
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from django.utils.timezone import now
-from sportscenters import paginators, perms, serializers
+from sportscenters import paginators, perms, serializers, rollups, caching, search, schedule, notifications
+from sportscenters.stats import normalize_period, period_bounds
+from sportscenters.mixins import ConditionalGetMixin, UserResponseCacheMixin
 from datetime import datetime, timedelta
-from django.db.models import Sum, Count
+from django.db import transaction, IntegrityError
+from django.db.models import Count, F, Exists, OuterRef
 from django.utils import timezone
-from django.core.cache import cache
+from django.utils.dateparse import parse_date, parse_datetime
 from .models import (
     Class, Trainer, User, Progress, Member, Enrollment, Payment,
     InternalNews, Appointment, Notification, Receptionist, Statistic
@@ -22,13 +25,21 @@ from rest_framework.response import Response
 from rest_framework import status
 
 
-class ClassViewSet(viewsets.ModelViewSet):
+class ClassViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ClassSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = paginators.StandardResultsSetPagination
+    # Sĩ số (cập nhật bằng UPDATE ... F()), is_enrolled và trainer_info không đổi updated_date của lớp
+    etag_namespaces = ('schedule', 'users')
 
     def get_queryset(self):
-        queryset = Class.objects.all()
+        # Chỉ xóa/khôi phục mới cần thấy các lớp đã bị xóa mềm
+        if self.action in ('destroy', 'restore'):
+            queryset = Class.objects.with_deleted()
+        else:
+            queryset = Class.objects.all()
+        # Thứ tự cố định để phân trang ổn định và trùng với bản async (async_views.class_list)
+        queryset = queryset.select_related('trainer').order_by('id')
         trainer_id = self.request.query_params.get('trainer')
         if trainer_id:
             queryset = queryset.filter(trainer_id=trainer_id)
@@ -39,11 +50,27 @@ class ClassViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        if instance.deleted_at:
-            return Response({"error": "Lớp học này không tồn tại hoặc đã bị xóa."}, status=404)
-        return super().retrieve(request, *args, **kwargs)
+    def save_without_conflicts(self, serializer):
+        data = serializer.validated_data
+        instance = serializer.instance
+        if instance and not set(data) & {'trainer', 'start_time', 'end_time', 'status'}:
+            serializer.save()
+            return
+        trainer = data.get('trainer', instance and instance.trainer)
+        start_time = data.get('start_time', instance.start_time if instance else now())
+        end_time = data.get('end_time', instance.end_time if instance else start_time)
+        class_status = data.get('status', instance and instance.status)
+        with transaction.atomic():
+            if class_status != 'cancelled':
+                schedule.ensure_trainer_available(trainer.pk, start_time, end_time,
+                                                  exclude_class=instance and instance.pk)
+            serializer.save()
+
+    def perform_create(self, serializer):
+        self.save_without_conflicts(serializer)
+
+    def perform_update(self, serializer):
+        self.save_without_conflicts(serializer)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -67,7 +94,7 @@ class ClassViewSet(viewsets.ModelViewSet):
         return Response({"message": f"Lớp học '{instance.name}' đã được khôi phục."}, status=200)
 
 
-class TrainerViewSet(viewsets.ModelViewSet):
+class TrainerViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Trainer.objects.all()
     serializer_class = TrainerSerializer
     pagination_class = paginators.StandardResultsSetPagination
@@ -81,32 +108,39 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView, generics.UpdateAPIVi
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH']:
             return [perms.OwnerPerms()]
+        if self.action == 'get_current_user':
+            return [permissions.IsAuthenticated()]
 
         return [permissions.AllowAny()]
 
     @action(methods=['get'], url_path='current-user', detail=False, permission_classes=[permissions.IsAuthenticated])
     def get_current_user(self, request):
-        return Response(serializers.UserSerializer(request.user).data)
+        return Response(caching.user_response(
+            request, 'current-user',
+            lambda: serializers.UserSerializer(request.user).data,
+            namespaces=('users',)
+        ))
 
 
 class MemberViewSet(viewsets.ModelViewSet):
     queryset = Member.objects.all()
     serializer_class = MemberSerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['first_name', 'last_name', 'email','full_name', 'phone']
-    pagination_class = paginators.StandardResultsSetPagination
+    filter_backends = [search.MemberSearchFilter]
+    pagination_class = paginators.CursorResultsSetPagination
 
     def get_queryset(self):
-        queryset = Member.objects.filter(active=True)
+        # MemberSerializer trả cả groups/user_permissions: prefetch để số truy vấn không tăng theo số dòng
+        queryset = Member.objects.filter(active=True).prefetch_related('groups', 'user_permissions')
         not_in_class = self.request.query_params.get('not_in_class')
         if not_in_class:
-            # Lọc ra những học viên chưa đăng ký lớp này
-            queryset = queryset.exclude(
-                id__in=Enrollment.objects.filter(
+            # Lọc ra những học viên chưa đăng ký lớp này (NOT EXISTS theo index gym_class, status, member)
+            queryset = queryset.filter(~Exists(
+                Enrollment.objects.filter(
                     gym_class_id=not_in_class,
-                    status='approved'
-                ).values_list('member_id', flat=True)
-            )
+                    status='approved',
+                    member_id=OuterRef('pk')
+                )
+            ))
         return queryset
 
 
@@ -116,13 +150,22 @@ class ReceptionistViewSet(viewsets.ModelViewSet):
     pagination_class = paginators.StandardResultsSetPagination
 
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = paginators.StandardResultsSetPagination
+    etag_namespaces = ('schedule', 'users')
+    BULK_LIMIT = 500
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        user = self.request.user
+        queryset = Enrollment.objects.select_related('member', 'gym_class', 'gym_class__trainer')
+        if user.role == 'member':
+            queryset = queryset.filter(member_id=user.pk)
+        elif user.role != 'receptionist':
+            return Enrollment.objects.none()
+
         gym_class_id = self.request.query_params.get('gym_class')
         member_id = self.request.query_params.get('member')
         if gym_class_id:
@@ -130,7 +173,7 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
         if member_id:
             queryset = queryset.filter(member_id=member_id)
 
-        return queryset.select_related('member', 'gym_class')
+        return queryset
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -145,43 +188,168 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("Bạn không có quyền tạo đăng ký.")
 
-        # Kiểm tra trùng đăng ký
+        # Kiểm tra trùng đăng ký (ràng buộc unique trong DB chặn các request đồng thời)
         if Enrollment.objects.filter(member=member, gym_class=gym_class).exists():
             raise ValidationError("Học viên đã đăng ký lớp học này rồi.")
 
-        # Kiểm tra sức chứa
-        if gym_class.current_capacity >= gym_class.max_members:
-            raise ValidationError("Lớp học đã đủ số lượng học viên.")
-
-        # Tạo enrollment và cập nhật số lượng
-        serializer.save(member=member)
-        gym_class.current_capacity += 1
-        gym_class.save()
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    # Trạng thái do giữ chỗ quyết định, không lấy từ request
+                    serializer.save(member=member, status='approved')
+            except IntegrityError:
+                raise ValidationError("Học viên đã đăng ký lớp học này rồi.")
+
+            # Giữ chỗ bằng một câu UPDATE có điều kiện ở cuối transaction để khóa dòng lớp học ngắn nhất
+            if not self.reserve_seat(gym_class):
+                # Lớp đã đủ: đưa vào danh sách chờ thay vì báo lỗi
+                enrollment = serializer.instance
+                enrollment.status = 'waitlisted'
+                Enrollment.objects.filter(pk=enrollment.pk).update(status='waitlisted')
+
+        gym_class.refresh_from_db(fields=['current_capacity'])
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Lễ tân đăng ký nhiều học viên vào một lớp: {"gym_class": 1, "members": [2, 3, ...]}.
+        Số truy vấn cố định, không phụ thuộc số học viên.
+        """
+        if request.user.role != 'receptionist':
+            raise PermissionDenied("Bạn không có quyền tạo đăng ký.")
 
-    def get_queryset(self):
-            user = self.request.user
-            if user.role == 'member':
-                return Enrollment.objects.filter(member=user)
-            elif user.role == 'receptionist':
-                return Enrollment.objects.all()
-            return Enrollment.objects.none()
+        gym_class_id = request.data.get('gym_class')
+        member_ids = request.data.get('members')
+        if not isinstance(member_ids, list) or not member_ids:
+            raise ValidationError({"members": "Danh sách học viên không hợp lệ."})
+        if len(member_ids) > self.BULK_LIMIT:
+            raise ValidationError({"members": f"Chỉ được đăng ký tối đa {self.BULK_LIMIT} học viên mỗi lần."})
+        try:
+            gym_class_id = int(gym_class_id)
+            member_ids = list(dict.fromkeys(int(pk) for pk in member_ids))
+        except (TypeError, ValueError):
+            raise ValidationError("Mã lớp học hoặc học viên không hợp lệ.")
+
+        found = set(Member.objects.filter(pk__in=member_ids).values_list('pk', flat=True))
+
+        with transaction.atomic():
+            # Khóa dòng lớp học để tính số chỗ còn trống cho cả nhóm
+            gym_class = Class.objects.select_for_update().filter(pk=gym_class_id).first()
+            if not gym_class:
+                raise ValidationError({"gym_class": "Lớp học không tồn tại."})
+            existing = set(Enrollment.objects.filter(
+                gym_class_id=gym_class_id, member_id__in=found).values_list('member_id', flat=True))
+
+            new_ids = [pk for pk in member_ids if pk in found and pk not in existing]
+            free = max(gym_class.max_members - gym_class.current_capacity, 0)
+            approved = set(new_ids[:free])
+            try:
+                Enrollment.objects.bulk_create([
+                    Enrollment(member_id=pk, gym_class_id=gym_class_id,
+                               status='approved' if pk in approved else 'waitlisted')
+                    for pk in new_ids
+                ], batch_size=500)
+            except IntegrityError:
+                raise ValidationError("Có học viên vừa được đăng ký đồng thời, vui lòng thử lại.")
+            if approved:
+                Class.objects.filter(pk=gym_class_id).update(
+                    current_capacity=F('current_capacity') + len(approved))
+
+        # bulk_create không phát signal nên tự làm mới cache thống kê và lịch
+        if new_ids:
+            caching.bump_version('stats', 'schedule')
+
+        results = []
+        for pk in member_ids:
+            if pk not in found:
+                result = 'not_found'
+            elif pk in existing:
+                result = 'already_enrolled'
+            elif pk in approved:
+                result = 'enrolled'
+            else:
+                result = 'waitlisted'
+            results.append({'member': pk, 'result': result})
+
+        summary = {}
+        for row in results:
+            summary[row['result']] = summary.get(row['result'], 0) + 1
+        return Response({
+            'gym_class': gym_class_id,
+            'summary': summary,
+            'results': results
+        }, status=status.HTTP_201_CREATED if new_ids else status.HTTP_200_OK)
+
+    def perform_update(self, serializer):
+        instance = serializer.instance
+        if serializer.validated_data.get('gym_class', instance.gym_class) != instance.gym_class:
+            raise ValidationError({"gym_class": "Không thể đổi lớp của đăng ký, hãy hủy và đăng ký lại."})
+        old_status = instance.status
+        new_status = serializer.validated_data.get('status', old_status)
+
+        with transaction.atomic():
+            if old_status == 'waitlisted' and new_status != 'waitlisted':
+                # Duyệt từ danh sách chờ: giữ chỗ bằng cùng câu UPDATE có điều kiện như khi tạo
+                if not self.reserve_seat(instance.gym_class):
+                    raise ValidationError({"status": "Lớp học đã đủ học viên."})
+            elif old_status != 'waitlisted' and new_status == 'waitlisted':
+                # Nhả chỗ trước khi lưu để không tự chọn lại chính đăng ký này
+                self.release_seat(instance.gym_class)
+            serializer.save()
 
     def perform_destroy(self, instance):
         # Cập nhật số lượng học viên khi hủy đăng ký
-        gym_class = instance.gym_class
-        gym_class.current_capacity = max(0, gym_class.current_capacity - 1)
-        gym_class.save()
-        instance.delete()
-
+        with transaction.atomic():
+            instance.delete()
+            # Mọi trạng thái trừ waitlisted đều đang giữ một chỗ
+            if instance.status != 'waitlisted':
+                self.release_seat(instance.gym_class)
+
+    def reserve_seat(self, gym_class):
+        return Class.objects.filter(
+            pk=gym_class.pk,
+            current_capacity__lt=F('max_members')
+        ).update(current_capacity=F('current_capacity') + 1)
+
+    def release_seat(self, gym_class):
+        """
+        Chỗ trống được chuyển cho người chờ sớm nhất, nếu không có thì giảm sức chứa. Phải gọi trong transaction.
+        """
+        if not self.promote_waitlisted(gym_class):
+            Class.objects.with_deleted().filter(
+                pk=gym_class.pk,
+                current_capacity__gt=0
+            ).update(current_capacity=F('current_capacity') - 1)
 
-class ProgressViewSet(viewsets.ModelViewSet):
+    def promote_waitlisted(self, gym_class):
+        """
+        Duyệt học viên chờ sớm nhất (FIFO) của lớp và gửi thông báo. Phải gọi trong transaction.
+        """
+        enrollment = (Enrollment.objects.select_for_update(skip_locked=True)
+                      .filter(gym_class=gym_class, status='waitlisted')
+                      .order_by('created_date', 'id')
+                      .first())
+        if not enrollment:
+            return None
+
+        enrollment.status = 'approved'
+        enrollment.save(update_fields=['status', 'updated_date'])
+        Notification.objects.create(
+            member_id=enrollment.member_id,
+            type='class_schedule',
+            message=f"Bạn đã được xếp vào lớp {gym_class.name} từ danh sách chờ."
+        )
+        return enrollment
+
+
+class ProgressViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Progress.objects.all()
     serializer_class = ProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = paginators.StandardResultsSetPagination
 
 
-class TrainerClassListView(generics.ListAPIView):
+class TrainerClassListView(UserResponseCacheMixin, generics.ListAPIView):
     serializer_class = ClassSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -190,19 +358,38 @@ class TrainerClassListView(generics.ListAPIView):
         if user.role == 'trainer':
             try:
                 trainer = Trainer.objects.get(pk=user.pk)
-                return Class.objects.filter(trainer=trainer)
+                return Class.objects.filter(trainer=trainer).select_related('trainer').order_by('id')
             except Trainer.DoesNotExist:
                 return Class.objects.none()
         return Class.objects.none()
 
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = paginators.StandardResultsSetPagination
 
-class TrainerStudentListView(generics.ListAPIView):
+    def save_without_conflicts(self, serializer):
+        data = serializer.validated_data
+        instance = serializer.instance
+        if instance and not set(data) & {'trainer', 'date_time'}:
+            serializer.save()
+            return
+        trainer = data.get('trainer', instance and instance.trainer)
+        date_time = data.get('date_time', instance and instance.date_time)
+        with transaction.atomic():
+            schedule.ensure_trainer_available(trainer.pk, date_time, date_time + schedule.APPOINTMENT_DURATION,
+                                              exclude_appointment=instance and instance.pk)
+            serializer.save()
+
+    def perform_create(self, serializer):
+        self.save_without_conflicts(serializer)
+
+    def perform_update(self, serializer):
+        self.save_without_conflicts(serializer)
+
+class TrainerStudentListView(UserResponseCacheMixin, generics.ListAPIView):
     serializer_class = MemberSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -228,24 +415,145 @@ class TrainerStudentListView(generics.ListAPIView):
 
         return Member.objects.filter(id__in=member_ids)
 
+class ScheduleViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @staticmethod
+    def parse_time(value):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = day and datetime.combine(day, datetime.min.time())
+        if parsed is None:
+            raise ValidationError({"detail": f"Thời gian '{value}' không hợp lệ."})
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    @staticmethod
+    def parse_ids(value):
+        try:
+            return sorted({int(pk) for pk in value.split(',') if pk}) if value else []
+        except ValueError:
+            raise ValidationError({"detail": "Danh sách id không hợp lệ."})
+
+    def parse_window(self, params):
+        start = self.parse_time(params['start']) if params.get('start') else \
+            timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+        end = self.parse_time(params['end']) if params.get('end') else start + timedelta(days=7)
+        if end <= start:
+            raise ValidationError({"detail": "Thời gian kết thúc phải sau thời gian bắt đầu."})
+        if end - start > schedule.MAX_WINDOW:
+            raise ValidationError({"detail": f"Chỉ xem được tối đa {schedule.MAX_WINDOW.days} ngày."})
+        return start, end
+
+    def list(self, request):
+        """
+        Lịch lớp học và lịch tư vấn trong [start, end).
+        ?start=&end= (ngày hoặc thời điểm ISO, mặc định 7 ngày từ hôm nay), ?trainers=1,2&members=3
+        """
+        params = request.query_params
+        start, end = self.parse_window(params)
+        trainer_ids = self.parse_ids(params.get('trainers'))
+        member_ids = self.parse_ids(params.get('members'))
+        if request.user.role == 'member':
+            # Hội viên chỉ xem được lịch của chính mình
+            trainer_ids, member_ids = [], [request.user.pk]
+
+        return Response({
+            'start': start,
+            'end': end,
+            'results': schedule.get_schedule(start, end, trainer_ids, member_ids)
+        })
+
+    @action(detail=False, methods=['get'], url_path='conflicts')
+    def conflicts(self, request):
+        """
+        Các cặp lịch trùng của HLV trong [start, end), ?trainers=1,2 để giới hạn.
+        """
+        if request.user.role == 'member':
+            raise PermissionDenied("Bạn không có quyền xem danh sách trùng lịch.")
+        start, end = self.parse_window(request.query_params)
+        trainer_ids = self.parse_ids(request.query_params.get('trainers'))
+        return Response({
+            'start': start,
+            'end': end,
+            'results': schedule.find_conflicts(start, end, trainer_ids)
+        })
+
+
 class PaymentViewSet(viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
-    pagination_class = paginators.StandardResultsSetPagination
+    pagination_class = paginators.CursorResultsSetPagination
 
 
 class NotificationViewSet(viewsets.ModelViewSet):
-    queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = paginators.StandardResultsSetPagination
+    pagination_class = paginators.CursorResultsSetPagination
 
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'member':
+            return Notification.objects.filter(member_id=user.pk)
+        if user.is_staff or user.role in ('admin', 'receptionist'):
+            return Notification.objects.all()
+        return Notification.objects.none()
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({'unread': notifications.unread_count(request.user.pk)})
+
+    @action(detail=False, methods=['post'], url_path='mark-all-read')
+    def mark_all_read(self, request):
+        updated = notifications.mark_all_read(request.user.pk)
+        return Response({'updated': updated, 'unread': 0})
+
+    def check_broadcast_permission(self, user):
+        if not (user.is_staff or user.role in ('admin', 'receptionist')):
+            raise PermissionDenied("Bạn không có quyền gửi thông báo hàng loạt.")
+
+    @action(detail=False, methods=['post'], url_path='broadcast')
+    def broadcast(self, request):
+        """
+        Gửi thông báo cho cả nhóm hội viên ở nền:
+        {"segment": "active_members" | "class" | "unpaid", "gym_class": 1, "type": "promotion", "message": "..."}
+        """
+        self.check_broadcast_permission(request.user)
+        segment = request.data.get('segment')
+        notification_type = request.data.get('type')
+        message = request.data.get('message')
+        gym_class_id = request.data.get('gym_class')
+
+        if segment not in notifications.SEGMENTS:
+            raise ValidationError({"segment": f"Nhóm phải là một trong: {', '.join(notifications.SEGMENTS)}."})
+        if notification_type not in dict(Notification.NOTIFICATION_TYPES):
+            raise ValidationError({"type": "Loại thông báo không hợp lệ."})
+        if not message:
+            raise ValidationError({"message": "Nội dung thông báo không được để trống."})
+        if segment == 'class':
+            if not gym_class_id or not Class.objects.filter(pk=gym_class_id).exists():
+                raise ValidationError({"gym_class": "Lớp học không tồn tại."})
+        else:
+            gym_class_id = None
+
+        progress = notifications.start_fanout(segment, notification_type, message, gym_class_id)
+        return Response(progress, status=status.HTTP_202_ACCEPTED)
 
-class InternalNewsViewSet(viewsets.ModelViewSet):
-    queryset = InternalNews.objects.all()
+    @action(detail=False, methods=['get'], url_path=r'broadcast/(?P<job_id>[0-9a-f]+)')
+    def broadcast_status(self, request, job_id=None):
+        self.check_broadcast_permission(request.user)
+        progress = notifications.get_progress(job_id)
+        if not progress:
+            return Response({"detail": "Không tìm thấy tiến trình gửi thông báo."}, status=404)
+        return Response(progress)
+
+
+class InternalNewsViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = InternalNews.objects.select_related('author').order_by('id')
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = InternalNewsSerializer
     pagination_class = paginators.StandardResultsSetPagination
+    etag_namespaces = ('users',)
 
 
 class StatisticViewSet(viewsets.ModelViewSet):
@@ -256,97 +564,37 @@ class StatisticViewSet(viewsets.ModelViewSet):
         """
         Lấy thống kê hội viên với cache.
         """
-        cache_key = f"member_stats_{period}_{start_date.date()}_{end_date.date()}"
-        stats = cache.get(cache_key)
-        if not stats:
-            stats = []
-            current_date = start_date
-            delta = {
-                'weekly': timedelta(days=7),
-                'monthly': timedelta(days=30),
-                'yearly': timedelta(days=365)
-            }.get(period, timedelta(days=30))
-
-            while current_date <= end_date:
-                period_end = current_date + delta
-                member_count = Member.objects.filter(
-                    active=True,
-                    join_date__lte=period_end.date()
-                ).count()
-                new_members = Member.objects.filter(
-                    join_date__range=[current_date.date(), period_end.date()]
-                ).count()
-                cancelled_members = Member.objects.filter(
-                    cancellation_date__range=[current_date.date(), period_end.date()]
-                ).count()
-
-                stats.append({
-                    'period_start': current_date.date(),
-                    'period_end': period_end.date(),
-                    'member_count': member_count,
-                    'new_members': new_members,
-                    'cancelled_members': cancelled_members
-                })
-                current_date += delta
-
-            cache.set(cache_key, stats, timeout=3600)  # Cache 1 giờ
-        return stats
+        first_start, last_end = period_bounds(period, start_date, end_date)
+        cache_key = f"member_stats_{normalize_period(period)}_{first_start}_{last_end}"
+        return caching.get_or_compute(
+            'stats', cache_key,
+            lambda: rollups.member_stats(period, start_date, end_date),
+            timeout=3600  # Cache 1 giờ
+        )
 
     def get_revenue_stats(self, period, start_date, end_date):
         """
         Lấy thống kê doanh thu với cache.
         """
-        cache_key = f"revenue_stats_{period}_{start_date.date()}_{end_date.date()}"
-        stats = cache.get(cache_key)
-        if not stats:
-            stats = []
-            current_date = start_date
-            delta = {
-                'weekly': timedelta(days=7),
-                'monthly': timedelta(days=30),
-                'yearly': timedelta(days=365)
-            }.get(period, timedelta(days=30))
-
-            while current_date <= end_date:
-                period_end = current_date + delta
-                total_revenue = Payment.objects.filter(
-                    date_paid__range=[current_date, period_end],  # Sửa từ payment_date thành date_paid
-                    status='completed'
-                ).aggregate(total=Sum('amount'))['total'] or 0
-
-                stats.append({
-                    'period_start': current_date.date(),
-                    'period_end': period_end.date(),
-                    'total_revenue': total_revenue
-                })
-                current_date += delta
-
-            cache.set(cache_key, stats, timeout=3600)  # Cache 1 giờ
-        return stats
-
-    def get_class_stats(self, period, start_date, end_date):
+        first_start, last_end = period_bounds(period, start_date, end_date)
+        cache_key = f"revenue_stats_{normalize_period(period)}_{first_start}_{last_end}"
+        return caching.get_or_compute(
+            'stats', cache_key,
+            lambda: rollups.revenue_stats(period, start_date, end_date),
+            timeout=3600  # Cache 1 giờ
+        )
+
+    def get_class_stats(self, period, start_date, end_date, by_period=False):
         """
         Lấy thống kê lớp học với cache.
         """
-        cache_key = f"class_stats_{period}_{start_date.date()}_{end_date.date()}"
-        stats = cache.get(cache_key)
-        if not stats:
-            stats = []
-            classes = Class.objects.all()
-            for cls in classes:
-                total_enrollments = Enrollment.objects.filter(
-                    class_id=cls,
-                    created_date__date__range=[start_date, end_date]
-                ).count()
-
-                stats.append({
-                    'class_id': cls.id,
-                    'class_name': cls.name,
-                    'total_enrollments': total_enrollments
-                })
-
-            cache.set(cache_key, stats, timeout=3600)  # Cache 1 giờ
-        return stats
+        # Tổng tính theo đúng khoảng ngày nên khóa cache dùng ngày yêu cầu, không căn theo kỳ
+        cache_key = f"class_stats_{normalize_period(period)}_{start_date.date()}_{end_date.date()}_{int(by_period)}"
+        return caching.get_or_compute(
+            'stats', cache_key,
+            lambda: list(rollups.class_stats(period, start_date, end_date, by_period)),
+            timeout=3600  # Cache 1 giờ
+        )
 
     @action(detail=False, methods=['get'], url_path='members')
     def member_stats(self, request):
@@ -390,5 +638,11 @@ class StatisticViewSet(viewsets.ModelViewSet):
         except ValueError:
             return Response({'error': 'Invalid date format'}, status=400)
 
-        stats = self.get_class_stats(period, start_date, end_date)
+        by_period = request.query_params.get('by_period') in ('1', 'true')
+        stats = self.get_class_stats(period, start_date, end_date, by_period)
         return Response(stats)
+
+    @action(detail=False, methods=['get'], url_path='cache', permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        # ?namespace=responses để xem cache response theo người dùng
+        return Response(caching.cache_stats(request.query_params.get('namespace', 'stats')))